@@ -1,10 +1,31 @@
-from flask import Flask, session
+from flask import Flask, request
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from config import Config
 
-from .models import AdminUser, User, db, migrate_schema, seed_database
+from .cache import init_api_payload_cache, init_fragment_cache
+from .cli import register_cli
+from .compression import init_compression
+from .engine import install_engine_profiles
+from .freeze import FREEZE_ENVIRON_KEY
+from .identity import template_identity
+from .invalidation import invalidation_bus
+from .jsonprovider import init_json_provider
+from .metrics import init_metrics
+from .migrations import current_schema_version, latest_schema_version, upgrade
+from .models import db
+from .nplusone import nplusone_detector
+from .seed import seed_database
+from .templating import init_bytecode_cache, warm_templates
+from .passwords import password_hasher
+from .profiling import request_profiler
+from .ratelimit import rate_limiter
+from .replica import init_replica_routing
+from .slowlog import slow_query_log
+from .tasks import task_runner
 from .routes.admin import admin_bp
 from .routes.api import api_bp
+from .routes.metrics import metrics_bp
 from .routes.store import store_bp
 from .routes.user import user_bp
 from .utils import format_brl, format_datetime_br
@@ -13,37 +34,65 @@ from .utils import format_brl, format_datetime_br
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    init_json_provider(app)
+    if app.config.get("TRUSTED_PROXY_HOPS"):
+        hops = app.config["TRUSTED_PROXY_HOPS"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
 
     db.init_app(app)
+    install_engine_profiles(app)
+    password_hasher.init_app(app)
+    rate_limiter.init_app(app)
+    init_replica_routing(app)
+    invalidation_bus.init_app(app)
+    task_runner.init_app(app)
+    init_metrics(app)
+    request_profiler.init_app(app)
+    slow_query_log.init_app(app)
+    nplusone_detector.init_app(app)
     app.register_blueprint(store_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(api_bp)
     app.register_blueprint(user_bp)
+    app.register_blueprint(metrics_bp)
 
     app.jinja_env.filters["brl"] = format_brl
     app.jinja_env.filters["datetime_br"] = format_datetime_br
+    init_fragment_cache(app)
+    init_api_payload_cache(app)
+    init_bytecode_cache(app)
 
     @app.context_processor
     def inject_global_vars():
-        cart = session.get("cart", {})
-        if isinstance(cart, dict):
-            cart_count = sum(int(quantity) for quantity in cart.values() if str(quantity).isdigit())
-        else:
-            cart_count = 0
-
-        user_id = session.get("user_id")
-        current_user = db.session.get(User, user_id) if user_id else None
-        admin_user_id = session.get("admin_user_id")
-        current_admin = db.session.get(AdminUser, admin_user_id) if admin_user_id else None
         return {
-            "cart_items_count": cart_count,
-            "current_user": current_user,
-            "current_admin": current_admin,
+            **template_identity(),
+            "frozen_page": request.environ.get(FREEZE_ENVIRON_KEY, False),
         }
 
+    register_cli(app)
+    init_compression(app)
+
     with app.app_context():
-        db.create_all()
-        migrate_schema()
-        seed_database(app.config)
+        _check_schema(app)
+
+    if app.config.get("TEMPLATE_WARMUP"):
+        warm_templates(app)
 
     return app
+
+
+def _check_schema(app):
+    schema_version = current_schema_version()
+    if schema_version >= latest_schema_version():
+        return
+
+    if app.config.get("SCHEMA_AUTO_UPGRADE"):
+        upgrade()
+        seed_database(app.config)
+        return
+
+    app.logger.warning(
+        "Schema do banco na versao %s, esperado %s. Execute `flask --app wsgi db upgrade`.",
+        schema_version,
+        latest_schema_version(),
+    )
@@ -0,0 +1,42 @@
+import json
+import urllib.request
+
+from flask import current_app
+
+from .models import Occurrence, db
+from .tasks import task_runner
+
+
+CRITICAL_ALERT_TASK = "occurrence.critical_alert"
+
+
+@task_runner.task(CRITICAL_ALERT_TASK, durable=True)
+def notify_critical_occurrence(occurrence_id):
+    occurrence = db.session.get(Occurrence, occurrence_id)
+    if occurrence is None:
+        return
+    current_app.logger.warning(
+        "Ocorrencia critica #%s (%s) aguardando triagem.",
+        occurrence.id,
+        occurrence.mapped_category,
+    )
+    webhook_url = current_app.config.get("CRITICAL_ALERT_WEBHOOK_URL")
+    if not webhook_url:
+        return
+    # So o necessario para a triagem abrir o protocolo; contato e observacao ficam no painel.
+    payload = {
+        "occurrence_id": occurrence.id,
+        "mapped_category": occurrence.mapped_category,
+        "urgency_level": occurrence.urgency_level,
+        "created_at": occurrence.created_at.isoformat(),
+        "admin_path": f"/admin/ocorrencias/{occurrence.id}",
+    }
+    alert_request = urllib.request.Request(
+        webhook_url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    timeout = current_app.config.get("CRITICAL_ALERT_WEBHOOK_TIMEOUT", 5)
+    with urllib.request.urlopen(alert_request, timeout=timeout) as response:
+        response.read()
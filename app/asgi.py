@@ -0,0 +1,98 @@
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Query, Response
+from fastapi.middleware.wsgi import WSGIMiddleware
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config import Config
+
+from .cache import api_payload_cache
+from .catalog import api_products_statement, health_payload, render_api_products
+from .engine import install_sqlite_pragmas, register_engine
+from .invalidation import CATALOG_NAMESPACE, cache_versions_statement, invalidation_bus
+
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_url(database_url):
+    scheme, separator, rest = database_url.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme.split("+", 1)[0])
+    if not driver:
+        raise ValueError(f"Banco sem driver assincrono configurado: {scheme}")
+    return f"{driver}{separator}{rest}"
+
+
+def async_engine_options(engine_options):
+    options = dict(engine_options)
+    connect_args = dict(options.pop("connect_args", {}))
+    postgres_options = connect_args.pop("options", "")
+    if postgres_options.startswith("-c statement_timeout="):
+        # asyncpg recebe parametros de sessao via server_settings.
+        connect_args["server_settings"] = {
+            "statement_timeout": postgres_options.split("=", 1)[1]
+        }
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def _primary_engine(config_class):
+    # O corpo em cache vale para toda a versao do catalogo; uma replica atrasada o congelaria.
+    database_url = config_class.SQLALCHEMY_DATABASE_URI
+    engine_options = getattr(config_class, "SQLALCHEMY_ENGINE_OPTIONS", {})
+    engine = create_async_engine(
+        async_database_url(database_url), **async_engine_options(engine_options)
+    )
+    install_sqlite_pragmas(engine.sync_engine, getattr(config_class, "SQLITE_PRAGMAS", None))
+    register_engine(engine.sync_engine)
+    return engine
+
+
+def create_asgi_app(flask_app=None, config_class=Config):
+    engine = _primary_engine(config_class)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def catalog_version():
+        if invalidation_bus.needs_poll():
+            async with engine.connect() as connection:
+                rows = (await connection.execute(cache_versions_statement())).all()
+            invalidation_bus.apply_versions(rows)
+        return invalidation_bus.cached_version(CATALOG_NAMESPACE)
+
+    @asynccontextmanager
+    async def lifespan(api):
+        yield
+        await engine.dispose()
+
+    api = FastAPI(
+        title="Alo!Mana? API",
+        docs_url=None,
+        redoc_url=None,
+        openapi_url=None,
+        lifespan=lifespan,
+    )
+
+    @api.get("/api/health")
+    async def healthcheck():
+        return health_payload()
+
+    @api.get("/api/produtos")
+    async def list_products(q: str = Query(default="")):
+        # Mesmo cache e mesma chave da rota Flask: quem responder primeiro aquece para as duas.
+        search_term = q.strip()
+        key = (await catalog_version(), search_term)
+        body = api_payload_cache.get(key)
+        if body is None:
+            async with session_factory() as db_session:
+                products = (await db_session.scalars(api_products_statement(search_term))).all()
+            body = render_api_products(products)
+            api_payload_cache.set(key, body)
+        return Response(content=body, media_type="application/json")
+
+    if flask_app is not None:
+        api.mount("/", WSGIMiddleware(flask_app))
+    return api
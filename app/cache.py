@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from .invalidation import CATALOG_NAMESPACE, invalidation_bus
+
+
+def _entry_size(value):
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return 64
+
+
+class LRUCache:
+    def __init__(self, name, max_bytes=16 * 1024 * 1024, max_entries=10000, default_ttl=300):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_bytes=None, max_entries=None, default_ttl=None, enabled=None):
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if default_ttl is not None:
+                self.default_ttl = default_ttl
+            if enabled is not None:
+                self.enabled = enabled
+            self._evict()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        if not self.enabled:
+            return
+        size = _entry_size(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._size += size
+            self._evict()
+
+    def clear(self, *args):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+    def _evict(self):
+        while self._entries and (
+            self._size > self.max_bytes or len(self._entries) > self.max_entries
+        ):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._size -= size
+
+
+fragment_cache = LRUCache("fragments")
+api_payload_cache = LRUCache("api_payloads", max_bytes=8 * 1024 * 1024, max_entries=500)
+
+
+def fragment_key(key_parts):
+    if not isinstance(key_parts, (list, tuple)):
+        key_parts = (key_parts,)
+    return (invalidation_bus.version(CATALOG_NAMESPACE),) + tuple(str(part) for part in key_parts)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render_cached", args), [], [], body).set_lineno(
+            lineno
+        )
+
+    def _render_cached(self, key_parts, ttl, caller):
+        if not fragment_cache.enabled:
+            return caller()
+        key = fragment_key(key_parts)
+        rendered = fragment_cache.get(key)
+        if rendered is None:
+            rendered = str(caller())
+            fragment_cache.set(key, rendered, ttl)
+        return Markup(rendered)
+
+
+def init_fragment_cache(app):
+    fragment_cache.configure(
+        max_bytes=app.config.get("FRAGMENT_CACHE_MAX_BYTES"),
+        max_entries=app.config.get("FRAGMENT_CACHE_MAX_ENTRIES"),
+        default_ttl=app.config.get("FRAGMENT_CACHE_DEFAULT_TTL"),
+        enabled=app.config.get("FRAGMENT_CACHE_ENABLED", True),
+    )
+    fragment_cache.clear()
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    invalidation_bus.subscribe(CATALOG_NAMESPACE, fragment_cache.clear)
+
+
+def init_api_payload_cache(app):
+    api_payload_cache.configure(
+        max_bytes=app.config.get("API_PAYLOAD_CACHE_MAX_BYTES"),
+        max_entries=app.config.get("API_PAYLOAD_CACHE_MAX_ENTRIES"),
+        default_ttl=app.config.get("API_PAYLOAD_CACHE_TTL"),
+        enabled=app.config.get("API_PAYLOAD_CACHE_ENABLED", True),
+    )
+    api_payload_cache.clear()
+    invalidation_bus.subscribe(CATALOG_NAMESPACE, api_payload_cache.clear)
@@ -0,0 +1,282 @@
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import or_, select
+
+from .cache import api_payload_cache
+from .engine import upsert_statement
+from .invalidation import (
+    CATALOG_NAMESPACE,
+    MAPPINGS_NAMESPACE,
+    bump_namespace_version,
+    invalidation_bus,
+)
+from .jsonprovider import dumps_bytes
+from .models import VALID_URGENCY_LEVELS, OccurrenceMapping, Product, db
+
+
+PRODUCT_FIELDS = (
+    "slug",
+    "name",
+    "category_slug",
+    "category_label",
+    "price_cents",
+    "description_short",
+    "description_long",
+    "image_filename",
+    "featured_order",
+    "active",
+)
+MAPPING_FIELDS = ("occurrence_category", "urgency_level")
+TRUE_VALUES = {"1", "true", "sim", "s", "yes", "y"}
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+def api_products_statement(search_term=""):
+    statement = select(Product).where(Product.active.is_(True))
+    if search_term:
+        like_term = f"%{search_term}%"
+        statement = statement.where(
+            or_(Product.name.ilike(like_term), Product.description_short.ilike(like_term))
+        )
+    return statement.order_by(Product.featured_order.asc(), Product.id.asc())
+
+
+def serialize_api_product(product):
+    return {
+        "id": product.id,
+        "slug": product.slug,
+        "name": product.name,
+        "category": product.category_slug,
+        "price_cents": product.price_cents,
+        "image": product.image_filename,
+    }
+
+
+def render_api_products(products):
+    return dumps_bytes([serialize_api_product(product) for product in products]) + b"\n"
+
+
+def api_products_payload(search_term=""):
+    key = (catalog_version(), search_term)
+    body = api_payload_cache.get(key)
+    if body is None:
+        # Le do primario para nao congelar no cache uma replica atrasada.
+        statement = api_products_statement(search_term).execution_options(replica=False)
+        body = render_api_products(db.session.scalars(statement).all())
+        api_payload_cache.set(key, body)
+    return body
+
+
+def health_payload():
+    return {"status": "ok", "timestamp": datetime.utcnow().isoformat() + "Z"}
+
+
+def catalog_version():
+    return invalidation_bus.version(CATALOG_NAMESPACE)
+
+
+def _parse_bool(value, default=True):
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _parse_int(value, field, line_number, required=True):
+    if value is None or value == "":
+        if required:
+            raise CatalogImportError(f"Linha {line_number}: campo {field} obrigatorio.")
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise CatalogImportError(f"Linha {line_number}: {field} invalido ({value!r}).") from None
+
+
+def normalize_row(raw_row, line_number):
+    row = {key: (value.strip() if isinstance(value, str) else value) for key, value in raw_row.items()}
+    for field in ("slug", "name", "category_slug", "description_short", "image_filename"):
+        if not row.get(field):
+            raise CatalogImportError(f"Linha {line_number}: campo {field} obrigatorio.")
+
+    category_slug = row["category_slug"].lower()
+    product = {
+        "slug": row["slug"],
+        "name": row["name"],
+        "category_slug": category_slug,
+        "category_label": row.get("category_label") or category_slug.capitalize(),
+        "price_cents": _parse_int(row.get("price_cents"), "price_cents", line_number),
+        "description_short": row["description_short"],
+        "description_long": row.get("description_long") or row["description_short"],
+        "image_filename": row["image_filename"],
+        "featured_order": _parse_int(
+            row.get("featured_order"), "featured_order", line_number, required=False
+        ),
+        "active": _parse_bool(row.get("active")),
+    }
+
+    mapping = None
+    if row.get("occurrence_category"):
+        urgency_level = row.get("urgency_level") or "Baixa"
+        if urgency_level not in VALID_URGENCY_LEVELS:
+            raise CatalogImportError(
+                f"Linha {line_number}: urgency_level invalido ({urgency_level!r})."
+            )
+        mapping = {
+            "occurrence_category": row["occurrence_category"],
+            "urgency_level": urgency_level,
+        }
+    return product, mapping
+
+
+def _raw_catalog_rows(handle, file_format):
+    if file_format == "csv":
+        yield from enumerate(csv.DictReader(handle), start=2)
+        return
+
+    for line_number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise CatalogImportError(f"Linha {line_number}: JSON invalido ({exc}).") from None
+
+
+def read_catalog_file(path, file_format=None):
+    file_format = file_format or ("csv" if str(path).lower().endswith(".csv") else "jsonl")
+    seen_slugs = {}
+    with open(path, encoding="utf-8-sig", newline="") as handle:
+        for line_number, raw_row in _raw_catalog_rows(handle, file_format):
+            product, mapping = normalize_row(raw_row, line_number)
+            # Slug repetido no mesmo lote quebra o upsert do Postgres e duplicaria o resumo.
+            first_line = seen_slugs.setdefault(product["slug"], line_number)
+            if first_line != line_number:
+                raise CatalogImportError(
+                    f"Linha {line_number}: slug duplicado ({product['slug']!r}, "
+                    f"ja usado na linha {first_line})."
+                )
+            yield product, mapping
+
+
+def _batched(rows, batch_size):
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _diff_batch(connection, batch):
+    slugs = [product["slug"] for product, _ in batch]
+    existing_rows = connection.execute(
+        select(
+            Product.__table__,
+            OccurrenceMapping.occurrence_category,
+            OccurrenceMapping.urgency_level,
+        )
+        .select_from(Product.__table__.outerjoin(OccurrenceMapping.__table__))
+        .where(Product.slug.in_(slugs))
+    ).mappings()
+    existing = {row["slug"]: row for row in existing_rows}
+
+    changes = []
+    for product, mapping in batch:
+        current = existing.get(product["slug"])
+        if current is None:
+            changes.append(("created", product["slug"], []))
+            continue
+        fields = [
+            (field, current[field], product[field])
+            for field in PRODUCT_FIELDS
+            if current[field] != product[field]
+        ]
+        if mapping:
+            fields.extend(
+                (field, current[field], mapping[field])
+                for field in MAPPING_FIELDS
+                if current[field] != mapping[field]
+            )
+        changes.append(("updated" if fields else "unchanged", product["slug"], fields))
+    return changes
+
+
+def _write_batch(connection, batch, update_existing):
+    products = [product for product, _ in batch]
+    update_columns = [field for field in PRODUCT_FIELDS if field != "slug"] if update_existing else []
+    connection.execute(
+        upsert_statement(connection, Product.__table__, ["slug"], update_columns), products
+    )
+
+    product_ids = dict(
+        connection.execute(
+            select(Product.slug, Product.id).where(
+                Product.slug.in_([product["slug"] for product in products])
+            )
+        ).all()
+    )
+
+    explicit_mappings = []
+    default_mappings = []
+    for product, mapping in batch:
+        product_id = product_ids[product["slug"]]
+        if mapping and update_existing:
+            explicit_mappings.append({"product_id": product_id, **mapping})
+        else:
+            default_mappings.append(
+                {
+                    "product_id": product_id,
+                    "occurrence_category": (mapping or {}).get(
+                        "occurrence_category", "Ocorrencia geral"
+                    ),
+                    "urgency_level": (mapping or {}).get("urgency_level", "Baixa"),
+                }
+            )
+
+    if explicit_mappings:
+        connection.execute(
+            upsert_statement(
+                connection, OccurrenceMapping.__table__, ["product_id"], list(MAPPING_FIELDS)
+            ),
+            explicit_mappings,
+        )
+    if default_mappings:
+        connection.execute(
+            upsert_statement(connection, OccurrenceMapping.__table__, ["product_id"], []),
+            default_mappings,
+        )
+
+
+def import_catalog(rows, batch_size=500, dry_run=False, update_existing=True, progress=None):
+    summary = {"created": 0, "updated": 0, "unchanged": 0, "processed": 0}
+    changes = []
+
+    with db.engine.begin() as connection:
+        for batch in _batched(rows, batch_size):
+            batch_changes = _diff_batch(connection, batch)
+            for kind, _, _ in batch_changes:
+                summary[kind] += 1
+            if dry_run:
+                changes.extend(change for change in batch_changes if change[0] != "unchanged")
+
+            if not dry_run:
+                _write_batch(connection, batch, update_existing)
+
+            summary["processed"] += len(batch)
+            if progress:
+                progress(summary)
+
+        changed = summary["created"] + (summary["updated"] if update_existing else 0)
+        if changed and not dry_run:
+            bump_namespace_version(connection, CATALOG_NAMESPACE)
+            bump_namespace_version(connection, MAPPINGS_NAMESPACE)
+
+    return summary, changes
@@ -0,0 +1,223 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from .catalog import CatalogImportError, import_catalog, read_catalog_file
+from .freeze import freeze_site
+from .migrations import current_schema_version, latest_schema_version, upgrade
+from .models import db
+from .queryplans import PlanCheckError, run_plan_checks
+from .rollups import rebuild_rollups
+from .seed import seed_database
+from .synthetic import SyntheticDataError, generate_dataset
+from .tasks import task_runner
+from .templating import warm_templates
+
+
+db_cli = AppGroup("db", help="Migracoes de schema e carga inicial do banco.")
+catalog_cli = AppGroup("catalog", help="Importacao e manutencao do catalogo.")
+tasks_cli = AppGroup("tasks", help="Fila de tarefas em segundo plano.")
+
+
+@db_cli.command("upgrade")
+@click.option("--target", type=int, default=None, help="Versao alvo (padrao: a mais recente).")
+@click.option("--seed/--no-seed", default=True, help="Executa a carga inicial apos migrar.")
+def db_upgrade_command(target, seed):
+    applied = upgrade(target=target)
+    for version, description in applied:
+        click.echo(f"Aplicada migracao {version}: {description}")
+    if not applied:
+        click.echo("Schema ja esta atualizado.")
+    if seed:
+        seed_database(current_app.config)
+        click.echo("Carga inicial verificada.")
+    click.echo(f"Versao do schema: {current_schema_version()}")
+
+
+@db_cli.command("current")
+def db_current_command():
+    click.echo(f"Versao do schema: {current_schema_version()} (mais recente: {latest_schema_version()})")
+
+
+@db_cli.command("generate")
+@click.option("--products", type=click.IntRange(0), default=0, show_default=True)
+@click.option("--users", type=click.IntRange(0), default=0, show_default=True)
+@click.option("--occurrences", type=click.IntRange(0), default=0, show_default=True)
+@click.option("--admins", type=click.IntRange(0), default=0, show_default=True)
+@click.option("--seed", "random_seed", type=int, default=1, show_default=True)
+@click.option("--batch-size", type=click.IntRange(1, 100000), default=5000, show_default=True)
+@click.option("--days", type=click.IntRange(1), default=365, show_default=True, help="Janela de datas.")
+@click.option("--end-date", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Padrao: hoje.")
+@click.option("--password", default="usuario123", show_default=True, help="Senha das contas geradas.")
+@click.option("--analyze/--no-analyze", default=True, help="Atualiza estatisticas do planner ao final.")
+def db_generate_command(
+    products, users, occurrences, admins, random_seed, batch_size, days, end_date, password, analyze
+):
+    started = time.perf_counter()
+
+    def report_progress(table, done, total):
+        click.echo(f"  {table}: {done}/{total}", err=True)
+
+    try:
+        generate_dataset(
+            products=products,
+            users=users,
+            occurrences=occurrences,
+            admins=admins,
+            seed=random_seed,
+            batch_size=batch_size,
+            days=days,
+            end_date=end_date.date() if end_date else None,
+            password=password,
+            analyze=analyze,
+            progress=report_progress,
+        )
+    except SyntheticDataError as exc:
+        raise click.ClickException(str(exc)) from None
+    click.echo(
+        f"Gerados {products} produtos, {users} usuarias, {occurrences} ocorrencias e "
+        f"{admins} admins em {time.perf_counter() - started:.1f}s."
+    )
+
+
+@db_cli.command("check-plans")
+@click.option("--verbose", is_flag=True, help="Mostra consulta e plano tambem das rotas aprovadas.")
+def db_check_plans_command(verbose):
+    try:
+        results = run_plan_checks(current_app)
+    except PlanCheckError as exc:
+        raise click.ClickException(str(exc)) from None
+
+    failures = 0
+    for result in results:
+        check = result["check"]
+        if result["problems"]:
+            failures += 1
+            click.echo(f"FALHA {check['endpoint']} ({result['path']}): {'; '.join(result['problems'])}")
+        else:
+            click.echo(f"ok    {check['endpoint']} usa {check['index']}")
+        if result["plan"] and (verbose or result["problems"]):
+            click.echo("      " + " ".join(result["statement"].split())[:300])
+            for line in result["plan"].splitlines():
+                click.echo(f"      | {line}")
+    if failures:
+        click.echo(f"{failures} de {len(results)} rota(s) com plano fora do esperado.")
+        raise SystemExit(1)
+
+
+@db_cli.command("rebuild-rollups")
+@click.option("--start", type=click.DateTime(), default=None, help="Inicio (UTC); padrao: todo o historico.")
+@click.option("--end", type=click.DateTime(), default=None, help="Fim exclusivo (UTC); padrao: sem limite.")
+def db_rebuild_rollups_command(start, end):
+    if start and end and end <= start:
+        raise click.BadParameter("--end precisa ser depois de --start.")
+    started = time.perf_counter()
+    with db.engine.begin() as connection:
+        buckets = rebuild_rollups(connection, start, end)
+    click.echo(
+        f"{buckets} linha(s) de rollup recalculadas em {time.perf_counter() - started:.1f}s."
+    )
+
+
+@catalog_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "file_format", type=click.Choice(["csv", "jsonl"]), default=None)
+@click.option("--batch-size", type=click.IntRange(1, 5000), default=500, show_default=True)
+@click.option("--dry-run", is_flag=True, help="Mostra as diferencas sem gravar.")
+@click.option("--show", type=int, default=50, show_default=True, help="Diferencas exibidas no dry-run.")
+def catalog_import_command(path, file_format, batch_size, dry_run, show):
+    def report_progress(summary):
+        click.echo(f"  {summary['processed']} linhas processadas...", err=True)
+
+    try:
+        summary, changes = import_catalog(
+            read_catalog_file(path, file_format),
+            batch_size=batch_size,
+            dry_run=dry_run,
+            progress=report_progress,
+        )
+    except CatalogImportError as exc:
+        raise click.ClickException(str(exc)) from None
+
+    for kind, slug, fields in changes[:show]:
+        if kind == "created":
+            click.echo(f"+ {slug}")
+            continue
+        for field, old_value, new_value in fields:
+            click.echo(f"~ {slug}: {field}: {old_value!r} -> {new_value!r}")
+    if len(changes) > show:
+        click.echo(f"... e mais {len(changes) - show} produtos alterados.")
+
+    prefix = "[dry-run] " if dry_run else ""
+    click.echo(
+        f"{prefix}{summary['processed']} linhas: {summary['created']} novos, "
+        f"{summary['updated']} atualizados, {summary['unchanged']} sem alteracao."
+    )
+
+
+@click.command("warm-templates")
+def warm_templates_command():
+    timings = warm_templates(current_app, reset=True)
+    for template_name, elapsed in sorted(timings.items(), key=lambda item: -item[1]):
+        click.echo(f"{elapsed * 1000:8.2f} ms  {template_name}")
+    click.echo(f"Total: {sum(timings.values()) * 1000:.1f} ms")
+
+
+@click.command("freeze")
+@click.option("--output", "output_dir", type=click.Path(file_okay=False), default=None)
+@click.option("--force", is_flag=True, help="Renderiza todas as paginas mesmo sem mudancas.")
+def freeze_command(output_dir, force):
+    output_dir = output_dir or current_app.config["FREEZE_OUTPUT_DIR"]
+    summary = freeze_site(
+        current_app,
+        output_dir,
+        force=force,
+        progress=lambda path: click.echo(f"  {path}", err=True),
+    )
+    for path, status_code in summary["errors"]:
+        click.echo(f"Falha ao renderizar {path}: HTTP {status_code}", err=True)
+    if not summary["rendered"]:
+        click.echo("Catalogo e templates sem mudancas; nada a renderizar.")
+    click.echo(
+        f"{summary['rendered']} paginas renderizadas, {summary['written']} gravadas, "
+        f"{summary['removed']} removidas, {summary['static_copied']} arquivos estaticos "
+        f"copiados para {output_dir}."
+    )
+    if summary["errors"]:
+        raise SystemExit(1)
+
+
+def _durable_queue():
+    if task_runner.durable is None:
+        raise click.ClickException("Fila duravel desativada (TASKS_ENABLED ou TASKS_DURABLE_PATH).")
+    return task_runner.durable
+
+
+@tasks_cli.command("status")
+@click.option("--failed", "show_failed", type=int, default=10, show_default=True, help="Falhas exibidas.")
+def tasks_status_command(show_failed):
+    durable = _durable_queue()
+    stats = durable.stats()
+    depth = stats["depth"]
+    click.echo(
+        f"Fila duravel {durable.path}: {depth['pending']} pendentes, {depth['running']} em execucao, "
+        f"{depth['failed']} com falha; atraso {stats['lag_seconds']:.1f}s."
+    )
+    for task_id, name, attempts, enqueued_at, last_error in durable.failed(limit=show_failed):
+        enqueued = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(enqueued_at))
+        click.echo(f"  #{task_id} {name} ({attempts} tentativas, desde {enqueued}): {last_error}")
+
+
+@tasks_cli.command("requeue-failed")
+def tasks_requeue_failed_command():
+    click.echo(f"{_durable_queue().requeue_failed()} tarefa(s) devolvidas para a fila.")
+
+
+def register_cli(app):
+    app.cli.add_command(db_cli)
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(tasks_cli)
+    app.cli.add_command(warm_templates_command)
+    app.cli.add_command(freeze_command)
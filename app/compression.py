@@ -0,0 +1,228 @@
+import itertools
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli e opcional; sem ele so gzip e oferecido
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def _parse_accept_encoding(header_value):
+    accepted = {}
+    for part in (header_value or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header_value):
+    accepted = _parse_accept_encoding(header_value)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (("br", "gzip") if brotli is not None else ("gzip",))
+    best = None
+    best_quality = 0.0
+    for coding in candidates:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding, level, brotli_quality):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._process = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        else:
+            # wbits 16+ gera o envelope gzip.
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._process = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def compress(self, data):
+        return self._process(data)
+
+    def flush(self):
+        return self._flush()
+
+    def finish(self):
+        return self._finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, wsgi_app, min_size=500, level=6, brotli_quality=4, flush_bytes=8192):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.flush_bytes = flush_bytes
+        self.level = level
+        self.brotli_quality = brotli_quality
+
+    def __call__(self, environ, start_response):
+        encoding = choose_encoding(environ.get("HTTP_ACCEPT_ENCODING"))
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            encoding = None
+
+        captured = {}
+        buffered_writes = []
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured["status"] = status
+            captured["headers"] = headers
+            captured["exc_info"] = exc_info
+            return buffered_writes.append
+
+        app_iter = self.wsgi_app(environ, capture_start_response)
+        if "status" not in captured:
+            # Apps que so chamam start_response ao produzir o primeiro bloco.
+            close = getattr(app_iter, "close", None)
+            app_iter = iter(app_iter)
+            first_chunk = next(app_iter, b"")
+            app_iter = _PrependedIterable(first_chunk, app_iter, close)
+
+        status = captured["status"]
+        headers = list(captured["headers"])
+        compressible = self._is_compressible(status, headers)
+        if compressible:
+            headers = _add_vary(headers)
+
+        content_length = _header(headers, "Content-Length")
+        if (
+            not compressible
+            or encoding is None
+            or (content_length is not None and int(content_length) < self.min_size)
+        ):
+            write = start_response(status, headers, captured["exc_info"])
+            for chunk in buffered_writes:
+                write(chunk)
+            return app_iter
+
+        headers = [
+            (name, _weak_etag(value) if name.lower() == "etag" else value)
+            for name, value in headers
+            if name.lower() != "content-length"
+        ]
+        headers.append(("Content-Encoding", encoding))
+        compressor = _Compressor(encoding, self.level, self.brotli_quality)
+
+        if content_length is not None:
+            body = b"".join(buffered_writes)
+            try:
+                body += b"".join(app_iter)
+            finally:
+                _close(app_iter)
+            compressed = compressor.compress(body) + compressor.finish()
+            headers.append(("Content-Length", str(len(compressed))))
+            start_response(status, headers, captured["exc_info"])
+            return [compressed]
+
+        start_response(status, headers, captured["exc_info"])
+        return self._stream(compressor, buffered_writes, app_iter)
+
+    def _stream(self, compressor, buffered_writes, app_iter):
+        pending_bytes = 0
+        try:
+            for chunk in itertools.chain(buffered_writes, app_iter):
+                if not chunk:
+                    continue
+                output = compressor.compress(chunk)
+                pending_bytes += len(chunk)
+                # Blocos pequenos sao agrupados antes do flush para nao inflar a saida.
+                if pending_bytes >= self.flush_bytes:
+                    output += compressor.flush()
+                    pending_bytes = 0
+                if output:
+                    yield output
+            yield compressor.finish()
+        finally:
+            _close(app_iter)
+
+    def _is_compressible(self, status, headers):
+        status_code = int(status.split(" ", 1)[0])
+        if status_code < 200 or status_code in (204, 206, 304):
+            return False
+        if _header(headers, "Content-Encoding"):
+            return False
+        if "no-transform" in (_header(headers, "Cache-Control") or "").lower():
+            return False
+        content_type = (_header(headers, "Content-Type") or "").split(";", 1)[0].strip().lower()
+        return content_type.startswith(COMPRESSIBLE_MIMETYPES)
+
+
+def _header(headers, name):
+    name = name.lower()
+    for header_name, value in headers:
+        if header_name.lower() == name:
+            return value
+    return None
+
+
+def _weak_etag(value):
+    # O corpo comprimido difere byte a byte do original.
+    return value if value.startswith("W/") else f"W/{value}"
+
+
+def _add_vary(headers):
+    vary = _header(headers, "Vary")
+    if vary is None:
+        return headers + [("Vary", "Accept-Encoding")]
+    if "accept-encoding" in vary.lower() or vary.strip() == "*":
+        return headers
+    return [
+        (name, f"{value}, Accept-Encoding" if name.lower() == "vary" else value)
+        for name, value in headers
+    ]
+
+
+def _close(app_iter):
+    close = getattr(app_iter, "close", None)
+    if close is not None:
+        close()
+
+
+class _PrependedIterable:
+    def __init__(self, first_chunk, rest, close):
+        self._first_chunk = first_chunk
+        self._rest = rest
+        self._close = close
+
+    def __iter__(self):
+        if self._first_chunk:
+            yield self._first_chunk
+        yield from self._rest
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+
+
+def init_compression(app):
+    if not app.config.get("COMPRESSION_ENABLED", True):
+        return
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        min_size=app.config.get("COMPRESSION_MIN_SIZE", 500),
+        level=app.config.get("COMPRESSION_LEVEL", 6),
+        brotli_quality=app.config.get("COMPRESSION_BROTLI_QUALITY", 4),
+    )
@@ -0,0 +1,74 @@
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .models import db
+
+
+_ENGINES = []
+
+
+def _apply_sqlite_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _is_file_database(engine):
+    database = engine.url.database
+    return bool(database) and database != ":memory:" and not database.startswith("file::memory:")
+
+
+def register_engine(engine):
+    if engine not in _ENGINES:
+        _ENGINES.append(engine)
+
+
+def dispose_engines():
+    for engine in _ENGINES:
+        engine.dispose(close=False)
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+    engine_pragmas = dict(pragmas)
+    if not _is_file_database(engine):
+        # WAL e mmap nao se aplicam a bancos em memoria.
+        engine_pragmas.pop("journal_mode", None)
+        engine_pragmas.pop("mmap_size", None)
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(engine_pragmas, dbapi_connection, connection_record)
+
+    event.listen(engine, "connect", apply_pragmas)
+
+
+def install_engine_profiles(app):
+    pragmas = app.config.get("SQLITE_PRAGMAS")
+    with app.app_context():
+        for engine in db.engines.values():
+            register_engine(engine)
+            install_sqlite_pragmas(engine, pragmas)
+
+
+def upsert_statement(connection, table, index_elements, update_columns, increment=False):
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        statement = postgresql_insert(table)
+    elif dialect == "sqlite":
+        statement = sqlite_insert(table)
+    else:
+        raise NotImplementedError(f"Upsert nao suportado para o banco {dialect}.")
+
+    if not update_columns:
+        return statement.on_conflict_do_nothing(index_elements=index_elements)
+    if increment:
+        # Contadores: soma o valor novo ao existente em vez de sobrescrever.
+        set_ = {column: table.c[column] + statement.excluded[column] for column in update_columns}
+    else:
+        set_ = {column: statement.excluded[column] for column in update_columns}
+    return statement.on_conflict_do_update(index_elements=index_elements, set_=set_)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import shutil
+
+from .catalog import catalog_version
+from .models import Product
+from .routes.store import CATEGORY_PAGE_COPY
+
+
+FREEZE_ENVIRON_KEY = "alomana.freeze"
+MANIFEST_FILENAME = ".freeze-manifest.json"
+
+
+def frozen_paths():
+    paths = ["/", "/produtos", "/institucional"]
+    paths.extend(f"/categoria/{slug}" for slug in CATEGORY_PAGE_COPY)
+    slugs = Product.query.with_entities(Product.slug).filter(Product.active.is_(True))
+    paths.extend(f"/produto/{slug}" for (slug,) in slugs.order_by(Product.id.asc()))
+    return paths
+
+
+def output_file_for(output_dir, path):
+    relative = path.strip("/")
+    return os.path.join(output_dir, relative, "index.html")
+
+
+def templates_fingerprint(app):
+    digest = hashlib.sha256()
+    for folder in (os.path.join(app.root_path, app.template_folder), app.static_folder):
+        for root, _, files in sorted(os.walk(folder)):
+            for filename in sorted(files):
+                file_path = os.path.join(root, filename)
+                stat = os.stat(file_path)
+                digest.update(f"{file_path}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return digest.hexdigest()
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILENAME), encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(output_dir, manifest):
+    with open(os.path.join(output_dir, MANIFEST_FILENAME), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+
+
+def _sync_static(app, output_dir):
+    copied = 0
+    target_root = os.path.join(output_dir, "static")
+    for root, _, files in os.walk(app.static_folder):
+        relative_root = os.path.relpath(root, app.static_folder)
+        for filename in files:
+            source = os.path.join(root, filename)
+            target = os.path.normpath(os.path.join(target_root, relative_root, filename))
+            source_stat = os.stat(source)
+            if os.path.exists(target):
+                target_stat = os.stat(target)
+                if (
+                    target_stat.st_size == source_stat.st_size
+                    and target_stat.st_mtime_ns >= source_stat.st_mtime_ns
+                ):
+                    continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+            copied += 1
+    return copied
+
+
+def freeze_site(app, output_dir, force=False, progress=None):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _load_manifest(output_dir)
+    version = catalog_version()
+    fingerprint = templates_fingerprint(app)
+    summary = {"rendered": 0, "written": 0, "removed": 0, "static_copied": 0, "errors": []}
+
+    summary["static_copied"] = _sync_static(app, output_dir)
+
+    paths = frozen_paths()
+    up_to_date = (
+        not force
+        and manifest.get("catalog_version") == version
+        and manifest.get("templates_fingerprint") == fingerprint
+        and set(manifest.get("pages", {})) == set(paths)
+        and all(os.path.exists(output_file_for(output_dir, path)) for path in paths)
+    )
+    if up_to_date:
+        return summary
+
+    previous_pages = manifest.get("pages", {})
+    pages = {}
+    client = app.test_client()
+    for path in paths:
+        response = client.get(path, environ_overrides={FREEZE_ENVIRON_KEY: True})
+        summary["rendered"] += 1
+        if response.status_code != 200:
+            summary["errors"].append((path, response.status_code))
+            continue
+
+        body = response.get_data()
+        content_hash = hashlib.sha256(body).hexdigest()
+        pages[path] = content_hash
+        target = output_file_for(output_dir, path)
+        if previous_pages.get(path) != content_hash or not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as handle:
+                handle.write(body)
+            summary["written"] += 1
+        if progress:
+            progress(path)
+
+    for stale_path in set(previous_pages) - set(pages):
+        stale_file = output_file_for(output_dir, stale_path)
+        if os.path.exists(stale_file):
+            os.remove(stale_file)
+            summary["removed"] += 1
+
+    _write_manifest(
+        output_dir,
+        {"catalog_version": version, "templates_fingerprint": fingerprint, "pages": pages},
+    )
+    return summary
@@ -0,0 +1,88 @@
+from flask import g, session
+from werkzeug.local import LocalProxy
+
+from app.models import AdminUser, User, db
+
+
+USER_SESSION_KEY = "user_id"
+ADMIN_SESSION_KEY = "admin_user_id"
+CART_SESSION_KEY = "cart"
+
+_MISSING = object()
+
+
+def _load_once(cache_key, loader):
+    value = g.get(cache_key, _MISSING)
+    if value is _MISSING:
+        value = loader()
+        setattr(g, cache_key, value)
+    return value
+
+
+def _load_user():
+    user_id = session.get(USER_SESSION_KEY)
+    if not user_id:
+        return None
+    return db.session.get(User, user_id)
+
+
+def _load_admin():
+    admin_user_id = session.get(ADMIN_SESSION_KEY)
+    if not admin_user_id:
+        return None
+    return db.session.get(AdminUser, admin_user_id)
+
+
+def _count_cart_items():
+    cart = session.get(CART_SESSION_KEY, {})
+    if not isinstance(cart, dict):
+        return 0
+    return sum(int(quantity) for quantity in cart.values() if str(quantity).isdigit())
+
+
+def current_user():
+    return _load_once("_identity_user", _load_user)
+
+
+def current_admin():
+    return _load_once("_identity_admin", _load_admin)
+
+
+def cart_items_count():
+    return _load_once("_identity_cart_count", _count_cart_items)
+
+
+def login_user(user):
+    session[USER_SESSION_KEY] = user.id
+    session.modified = True
+    g._identity_user = user
+
+
+def logout_user():
+    session.pop(USER_SESSION_KEY, None)
+    session.modified = True
+    g._identity_user = None
+
+
+def login_admin(admin_user):
+    session[ADMIN_SESSION_KEY] = admin_user.id
+    session.modified = True
+    g._identity_admin = admin_user
+
+
+def logout_admin():
+    session.pop(ADMIN_SESSION_KEY, None)
+    session.modified = True
+    g._identity_admin = None
+
+
+def reset_cart_summary():
+    g.pop("_identity_cart_count", None)
+
+
+def template_identity():
+    return {
+        "cart_items_count": LocalProxy(cart_items_count),
+        "current_user": LocalProxy(current_user),
+        "current_admin": LocalProxy(current_admin),
+    }
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from .engine import upsert_statement
+from .models import CacheVersion, db
+from .tasks import task_runner
+
+
+CATALOG_NAMESPACE = "catalog"
+MAPPINGS_NAMESPACE = "mappings"
+REFRESH_VERSIONS_TASK = "cache.refresh_versions"
+
+
+def bump_namespace_version(connection, namespace):
+    result = connection.execute(
+        update(CacheVersion.__table__)
+        .where(CacheVersion.namespace == namespace)
+        .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        connection.execute(
+            upsert_statement(connection, CacheVersion.__table__, ["namespace"], []),
+            {"namespace": namespace, "version": 1, "updated_at": datetime.utcnow()},
+        )
+
+
+def cache_versions_statement():
+    return select(CacheVersion.namespace, CacheVersion.version)
+
+
+class InvalidationBus:
+    def __init__(self):
+        self.check_ttl = 2.0
+        self._hooks = defaultdict(list)
+        self._versions = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.logger = None
+
+    def init_app(self, app):
+        self.check_ttl = float(app.config.get("INVALIDATION_CHECK_TTL", self.check_ttl))
+        self._versions = {}
+        self._checked_at = 0.0
+        self.logger = app.logger
+        app.before_request(self.poll)
+        app.extensions["invalidation_bus"] = self
+
+    def subscribe(self, namespace, hook=None):
+        def register(func):
+            # create_app roda varias vezes no mesmo processo (testes, freeze); um hook por namespace.
+            if func not in self._hooks[namespace]:
+                self._hooks[namespace].append(func)
+            return func
+
+        return register(hook) if hook is not None else register
+
+    def publish(self, namespace):
+        bump_namespace_version(db.session.connection(), namespace)
+        # O proprio worker nao precisa esperar o TTL para enxergar a mudanca.
+        self._checked_at = 0.0
+        task_runner.after_commit(REFRESH_VERSIONS_TASK)
+
+    def version(self, namespace):
+        self.poll()
+        return self._versions.get(namespace, 0)
+
+    def versions(self):
+        self.poll()
+        return dict(self._versions)
+
+    def cached_version(self, namespace):
+        return self._versions.get(namespace, 0)
+
+    def needs_poll(self):
+        return time.monotonic() - self._checked_at >= self.check_ttl
+
+    def poll(self):
+        if not self.needs_poll():
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            rows = db.session.execute(
+                cache_versions_statement().execution_options(replica=False)
+            ).all()
+            changed = self._store_versions(rows)
+        finally:
+            self._lock.release()
+        self._run_hooks(changed)
+
+    def apply_versions(self, rows):
+        # Para quem le as versoes fora do Flask (a API assincrona).
+        with self._lock:
+            changed = self._store_versions(rows)
+        self._run_hooks(changed)
+
+    def _store_versions(self, rows):
+        changed = []
+        for namespace, version in rows:
+            if self._versions.get(namespace) != version:
+                changed.append((namespace, version))
+                self._versions[namespace] = version
+        self._checked_at = time.monotonic()
+        return changed
+
+    def _run_hooks(self, changed):
+        for namespace, version in changed:
+            for hook in self._hooks.get(namespace, ()):
+                try:
+                    hook(namespace, version)
+                except Exception:
+                    (self.logger or current_app.logger).exception(
+                        "Falha ao invalidar cache %s.", namespace
+                    )
+
+
+invalidation_bus = InvalidationBus()
+
+
+@task_runner.task(REFRESH_VERSIONS_TASK, max_retries=0)
+def refresh_versions():
+    # Roda os hooks fora da requisicao que publicou; a proxima ja encontra o cache limpo.
+    invalidation_bus.poll()
@@ -0,0 +1,484 @@
+import atexit
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+
+from flask import g, has_app_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+from .models import db
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+ARCHIVE_FILENAME = "archived.json"
+LOCK_FILENAME = ".lock"
+
+
+def _labels_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}
+        self._values = {}
+        self._collectors = {}
+        self.multiprocess_dir = None
+        self.flush_interval = 1.0
+        self._flushed_at = 0.0
+        self._flush_timer = None
+        os.register_at_fork(after_in_child=self.reset)
+
+    def counter(self, name, help_text):
+        self._families[name] = {"type": "counter", "help": help_text}
+
+    def gauge(self, name, help_text, mode="livesum"):
+        self._families[name] = {"type": "gauge", "help": help_text, "mode": mode}
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._families[name] = {"type": "histogram", "help": help_text, "buckets": list(buckets)}
+
+    def add_collector(self, name, collector):
+        self._collectors[name] = collector
+
+    def reset(self):
+        # Valores herdados do master (preload) seriam contados em dobro nos workers.
+        with self._lock:
+            self._values = {}
+            self._flushed_at = 0.0
+            self._flush_timer = None
+
+    def inc(self, name, labels=None, amount=1.0):
+        key = (name, _labels_key(labels or {}))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, name, labels=None, value=0.0):
+        with self._lock:
+            self._values[(name, _labels_key(labels or {}))] = value
+
+    def observe(self, name, value, labels=None):
+        key = (name, _labels_key(labels or {}))
+        buckets = self._families[name]["buckets"]
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    state["buckets"][index] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = [
+                [
+                    name,
+                    list(map(list, labels)),
+                    dict(value, buckets=list(value["buckets"])) if isinstance(value, dict) else value,
+                ]
+                for (name, labels), value in self._values.items()
+            ]
+        for collector in list(self._collectors.values()):
+            try:
+                for name, labels, value in collector():
+                    samples.append([name, list(map(list, _labels_key(labels))), value])
+            except Exception:
+                continue
+        return {"pid": os.getpid(), "samples": samples}
+
+    def flush(self, force=False):
+        if not self.multiprocess_dir:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < self.flush_interval:
+            self._schedule_flush()
+            return
+        self._flushed_at = now
+        path = os.path.join(self.multiprocess_dir, f"{os.getpid()}.json")
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(temporary_path, path)
+
+    def _schedule_flush(self):
+        # Garante que um worker ocioso publique as ultimas requisicoes.
+        with self._lock:
+            if self._flush_timer is not None:
+                return
+            self._flush_timer = threading.Timer(self.flush_interval, self._timed_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _timed_flush(self):
+        with self._lock:
+            self._flush_timer = None
+        self.flush(force=True)
+
+    def collect(self):
+        if not self.multiprocess_dir:
+            return self._merge([self.snapshot()], live_pids={os.getpid()})
+        self.flush(force=True)
+        with open(os.path.join(self.multiprocess_dir, LOCK_FILENAME), "a") as lock_handle:
+            fcntl.flock(lock_handle, fcntl.LOCK_EX)
+            try:
+                return self._collect_files()
+            finally:
+                fcntl.flock(lock_handle, fcntl.LOCK_UN)
+
+    def _collect_files(self):
+        archive_path = os.path.join(self.multiprocess_dir, ARCHIVE_FILENAME)
+        archive = _read_json(archive_path) or {"pid": None, "samples": []}
+        snapshots = []
+        dead = []
+        for filename in os.listdir(self.multiprocess_dir):
+            if not filename.endswith(".json") or filename == ARCHIVE_FILENAME:
+                continue
+            snapshot = _read_json(os.path.join(self.multiprocess_dir, filename))
+            if snapshot is None:
+                continue
+            if _pid_alive(snapshot["pid"]):
+                snapshots.append(snapshot)
+            else:
+                dead.append((filename, snapshot))
+
+        if dead:
+            # Contadores de workers reciclados continuam valendo; gauges nao.
+            merged = self._merge([archive] + [snapshot for _, snapshot in dead], live_pids=set())
+            archive = {"pid": None, "samples": self._flatten(merged)}
+            temporary_path = f"{archive_path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as handle:
+                json.dump(archive, handle)
+            os.replace(temporary_path, archive_path)
+            for filename, _ in dead:
+                os.remove(os.path.join(self.multiprocess_dir, filename))
+
+        live_pids = {snapshot["pid"] for snapshot in snapshots}
+        return self._merge([archive] + snapshots, live_pids=live_pids)
+
+    def _merge(self, snapshots, live_pids):
+        merged = {}
+        for snapshot in snapshots:
+            alive = snapshot["pid"] in live_pids
+            for name, labels, value in snapshot["samples"]:
+                family = self._families.get(name)
+                if family is None:
+                    continue
+                key = (name, tuple(tuple(pair) for pair in labels))
+                if family["type"] == "gauge":
+                    if not alive:
+                        continue
+                    current = merged.get(key)
+                    if family.get("mode") == "max":
+                        merged[key] = value if current is None else max(current, value)
+                    else:
+                        merged[key] = (current or 0.0) + value
+                elif family["type"] == "histogram":
+                    current = merged.setdefault(
+                        key, {"buckets": [0] * len(family["buckets"]), "sum": 0.0, "count": 0}
+                    )
+                    if len(value["buckets"]) != len(current["buckets"]):
+                        continue
+                    current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                    current["sum"] += value["sum"]
+                    current["count"] += value["count"]
+                else:
+                    merged[key] = merged.get(key, 0.0) + value
+        return merged
+
+    def _flatten(self, merged):
+        return [[name, list(map(list, labels)), value] for (name, labels), value in merged.items()]
+
+    def render(self, merged=None):
+        merged = self.collect() if merged is None else merged
+        by_family = {}
+        for (name, labels), value in merged.items():
+            by_family.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name in sorted(by_family):
+            family = self._families[name]
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for labels, value in sorted(by_family[name]):
+                if family["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(family["buckets"], value["buckets"]):
+                    cumulative += count
+                    bucket_labels = labels + (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(
+                    f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {value['count']}"
+                )
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if value.is_integer():
+            return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+metrics = MetricsRegistry()
+
+metrics.counter("alomana_http_requests_total", "Requisicoes HTTP por rota e status.")
+metrics.histogram("alomana_http_request_duration_seconds", "Latencia das requisicoes HTTP.")
+metrics.gauge("alomana_http_requests_in_flight", "Requisicoes em andamento.")
+metrics.counter("alomana_db_queries_total", "Consultas SQL executadas.")
+metrics.counter("alomana_db_query_seconds_total", "Tempo acumulado em consultas SQL.")
+metrics.histogram(
+    "alomana_db_queries_per_request", "Consultas SQL por requisicao.", QUERY_COUNT_BUCKETS
+)
+metrics.histogram("alomana_db_time_per_request_seconds", "Tempo em SQL por requisicao.")
+metrics.histogram("alomana_db_pool_checkout_seconds", "Espera para obter conexao do pool.")
+metrics.gauge("alomana_db_pool_checked_out", "Conexoes em uso no pool.")
+metrics.gauge("alomana_db_pool_size", "Tamanho configurado do pool.")
+metrics.histogram("alomana_template_render_seconds", "Tempo de renderizacao de templates.")
+metrics.counter("alomana_cache_hits_total", "Acertos de cache em memoria.")
+metrics.counter("alomana_cache_misses_total", "Faltas de cache em memoria.")
+metrics.gauge("alomana_cache_entries", "Entradas em cache.")
+metrics.gauge("alomana_cache_bytes", "Bytes em cache.")
+metrics.counter("alomana_password_operations_total", "Operacoes de hash de senha.")
+metrics.counter("alomana_password_operation_seconds_total", "Tempo acumulado em hash de senha.")
+metrics.gauge("alomana_password_operation_max_seconds", "Maior duracao de hash.", mode="max")
+metrics.counter("alomana_password_rehash_total", "Senhas migradas para parametros novos.")
+metrics.counter("alomana_rate_limit_decisions_total", "Decisoes do rate limit.")
+metrics.gauge("alomana_cache_namespace_version", "Versao atual de cada namespace.", mode="max")
+metrics.gauge("alomana_task_queue_depth", "Tarefas em memoria aguardando execucao.")
+metrics.gauge("alomana_task_queue_lag_seconds", "Espera da tarefa mais antiga na fila.", mode="max")
+metrics.gauge("alomana_task_durable_queue_depth", "Tarefas na fila duravel por status.", mode="max")
+metrics.counter("alomana_tasks_total", "Execucoes de tarefas por resultado.")
+metrics.counter("alomana_task_seconds_total", "Tempo acumulado executando tarefas.")
+
+
+def _endpoint_label():
+    return request.endpoint or "nao_encontrado"
+
+
+def _start_request():
+    g.metrics_started_at = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_query_seconds = 0.0
+    g.metrics_endpoint = _endpoint_label()
+    metrics.inc("alomana_http_requests_in_flight", {"endpoint": g.metrics_endpoint})
+
+
+def _finish_request(response):
+    started_at = g.pop("metrics_started_at", None)
+    if started_at is None:
+        return response
+    endpoint = g.metrics_endpoint
+    labels = {"method": request.method, "endpoint": endpoint}
+    metrics.observe("alomana_http_request_duration_seconds", time.perf_counter() - started_at, labels)
+    metrics.inc("alomana_http_requests_total", {**labels, "status": response.status_code})
+    metrics.observe(
+        "alomana_db_queries_per_request", g.metrics_queries, {"endpoint": endpoint}
+    )
+    metrics.observe(
+        "alomana_db_time_per_request_seconds", g.metrics_query_seconds, {"endpoint": endpoint}
+    )
+    return response
+
+
+def _teardown_request(exc):
+    endpoint = g.pop("metrics_endpoint", None)
+    if endpoint is not None:
+        metrics.inc("alomana_http_requests_in_flight", {"endpoint": endpoint}, -1)
+    metrics.flush()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_query_started_at")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    endpoint = "-"
+    if has_app_context() and "metrics_queries" in g:
+        g.metrics_queries += 1
+        g.metrics_query_seconds += elapsed
+        endpoint = g.metrics_endpoint
+    metrics.inc("alomana_db_queries_total", {"endpoint": endpoint})
+    metrics.inc("alomana_db_query_seconds_total", {"endpoint": endpoint}, elapsed)
+
+
+_TIMED_POOL_CLASSES = {}
+
+
+def _timed_pool_class(pool_class, bind_label):
+    key = (pool_class, bind_label)
+    timed_class = _TIMED_POOL_CLASSES.get(key)
+    if timed_class is None:
+
+        class TimedPool(pool_class):
+            def _do_get(self):
+                started_at = time.perf_counter()
+                try:
+                    return super()._do_get()
+                finally:
+                    metrics.observe(
+                        "alomana_db_pool_checkout_seconds",
+                        time.perf_counter() - started_at,
+                        {"bind": bind_label},
+                    )
+
+        TimedPool.__name__ = f"Timed{pool_class.__name__}"
+        timed_class = _TIMED_POOL_CLASSES[key] = TimedPool
+    return timed_class
+
+
+def _instrument_engine(bind_key, engine):
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    # recreate() (dispose apos o fork) usa self.__class__, entao a troca persiste.
+    engine.pool.__class__ = _timed_pool_class(type(engine.pool), bind_key or "default")
+
+
+def _render_started(sender, template, context, **extra):
+    g.setdefault("metrics_template_stack", []).append(time.perf_counter())
+
+
+def _render_finished(sender, template, context, **extra):
+    stack = g.get("metrics_template_stack")
+    if not stack:
+        return
+    metrics.observe(
+        "alomana_template_render_seconds",
+        time.perf_counter() - stack.pop(),
+        {"template": template.name or "-"},
+    )
+
+
+def _collect_app_stats(app):
+    from .cache import api_payload_cache, fragment_cache
+    from .invalidation import invalidation_bus
+    from .passwords import password_hasher
+    from .ratelimit import rate_limiter
+    from .tasks import task_runner
+
+    def collect():
+        for cache in (fragment_cache, api_payload_cache):
+            stats = cache.stats()
+            labels = {"cache": cache.name}
+            yield "alomana_cache_hits_total", labels, stats["hits"]
+            yield "alomana_cache_misses_total", labels, stats["misses"]
+            yield "alomana_cache_entries", labels, stats["entries"]
+            yield "alomana_cache_bytes", labels, stats["bytes"]
+
+        password_metrics = password_hasher.metrics()
+        yield "alomana_password_rehash_total", {}, password_metrics.pop("rehash_count", 0)
+        for operation, entry in password_metrics.items():
+            labels = {"operation": operation}
+            yield "alomana_password_operations_total", labels, entry["count"]
+            yield "alomana_password_operation_seconds_total", labels, entry["total_seconds"]
+            yield "alomana_password_operation_max_seconds", labels, entry["max_seconds"]
+
+        for scope, counters in rate_limiter.metrics().items():
+            for decision, count in counters.items():
+                yield (
+                    "alomana_rate_limit_decisions_total",
+                    {"scope": scope, "decision": decision},
+                    count,
+                )
+
+        for namespace, version in invalidation_bus._versions.items():
+            yield "alomana_cache_namespace_version", {"namespace": namespace}, version
+
+        task_metrics = task_runner.metrics()
+        yield "alomana_task_queue_depth", {"queue": "memoria"}, task_metrics["queue_depth"]
+        yield "alomana_task_queue_lag_seconds", {"queue": "memoria"}, task_metrics["queue_lag_seconds"]
+        if task_metrics["durable"] is not None:
+            for status, depth in task_metrics["durable"]["depth"].items():
+                yield "alomana_task_durable_queue_depth", {"status": status}, depth
+            yield (
+                "alomana_task_queue_lag_seconds",
+                {"queue": "duravel"},
+                task_metrics["durable"]["lag_seconds"],
+            )
+        for (task_name, outcome), count in task_metrics["counts"].items():
+            yield "alomana_tasks_total", {"task": task_name, "outcome": outcome}, count
+        for task_name, seconds in task_metrics["seconds"].items():
+            yield "alomana_task_seconds_total", {"task": task_name}, seconds
+
+        with app.app_context():
+            for bind_key, engine in db.engines.items():
+                pool = engine.pool
+                labels = {"bind": bind_key or "default"}
+                if hasattr(pool, "checkedout"):
+                    yield "alomana_db_pool_checked_out", labels, pool.checkedout()
+                if hasattr(pool, "size"):
+                    yield "alomana_db_pool_size", labels, pool.size()
+
+    return collect
+
+
+def init_metrics(app):
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    metrics.multiprocess_dir = app.config.get("METRICS_MULTIPROC_DIR") or None
+    metrics.flush_interval = float(app.config.get("METRICS_FLUSH_INTERVAL", 1.0))
+    if metrics.multiprocess_dir:
+        os.makedirs(metrics.multiprocess_dir, exist_ok=True)
+        atexit.register(metrics.flush, force=True)
+
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            _instrument_engine(bind_key, engine)
+    metrics.add_collector("app", _collect_app_stats(app))
+
+    # Primeiro before_request para que a latencia inclua os demais hooks.
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+    app.extensions["metrics"] = metrics
@@ -0,0 +1,154 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from .models import (
+    AdminUser,
+    CacheVersion,
+    Occurrence,
+    OccurrenceHourlyRollup,
+    OccurrenceMapping,
+    OccurrenceNote,
+    OccurrenceStatusHistory,
+    OccurrenceUserMessage,
+    Product,
+    SlowQuery,
+    User,
+    db,
+)
+from .rollups import rebuild_rollups
+
+
+version_metadata = MetaData()
+
+schema_version_table = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+
+    return decorator
+
+
+def latest_schema_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def _add_column_if_missing(connection, table_name, column_name, column_ddl):
+    columns = {column["name"] for column in inspect(connection).get_columns(table_name)}
+    if column_name not in columns:
+        connection.execute(
+            text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_ddl}")
+        )
+
+
+@migration(1, "Tabelas iniciais de catalogo, usuarias e ocorrencias")
+def _initial_schema(connection):
+    db.metadata.create_all(
+        bind=connection,
+        tables=[
+            Product.__table__,
+            User.__table__,
+            AdminUser.__table__,
+            OccurrenceMapping.__table__,
+            Occurrence.__table__,
+            OccurrenceNote.__table__,
+            OccurrenceUserMessage.__table__,
+            OccurrenceStatusHistory.__table__,
+        ],
+    )
+    # Bancos criados antes do login de usuarias nao tinham occurrences.user_id.
+    _add_column_if_missing(connection, "occurrences", "user_id", "INTEGER")
+
+
+@migration(2, "Versoes de cache por namespace (catalogo)")
+def _cache_versions(connection):
+    db.metadata.create_all(bind=connection, tables=[CacheVersion.__table__])
+
+
+@migration(3, "Registro de consultas lentas")
+def _slow_queries(connection):
+    db.metadata.create_all(bind=connection, tables=[SlowQuery.__table__])
+
+
+COMPOSITE_INDEXES = (
+    ("occurrences", "ix_occurrences_user_id_created_at", "ix_occurrences_user_id"),
+    ("occurrences", "ix_occurrences_status_created_at", "ix_occurrences_status"),
+    ("products", "ix_products_category_slug_featured_order", "ix_products_category_slug"),
+)
+
+
+@migration(4, "Indices compostos de filtro + ordenacao")
+def _composite_indexes(connection):
+    tables = {"occurrences": Occurrence.__table__, "products": Product.__table__}
+    for table_name, index_name, replaced_index in COMPOSITE_INDEXES:
+        index = next(item for item in tables[table_name].indexes if item.name == index_name)
+        index.create(bind=connection, checkfirst=True)
+        # O prefixo do indice composto atende as mesmas buscas do indice simples.
+        connection.execute(text(f"DROP INDEX IF EXISTS {replaced_index}"))
+
+
+@migration(5, "Rollup horario de ocorrencias")
+def _occurrence_rollups(connection):
+    db.metadata.create_all(bind=connection, tables=[OccurrenceHourlyRollup.__table__])
+    # Historico anterior ao rollup entra de uma vez; dali em diante ele e incremental.
+    rebuild_rollups(connection)
+
+
+def current_schema_version(engine=None):
+    engine = engine or db.engine
+    try:
+        with engine.connect() as connection:
+            version = connection.execute(
+                text("SELECT MAX(version) FROM schema_version")
+            ).scalar()
+    except (OperationalError, ProgrammingError):
+        return 0
+    return version or 0
+
+
+def _lock_for_upgrade(connection):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(727001)"))
+
+
+def upgrade(target=None, engine=None):
+    engine = engine or db.engine
+    target = latest_schema_version() if target is None else target
+    applied = []
+
+    with engine.begin() as connection:
+        version_metadata.create_all(bind=connection)
+
+    for version, description, func in MIGRATIONS:
+        if version > target:
+            break
+        with engine.begin() as connection:
+            _lock_for_upgrade(connection)
+            already_applied = connection.execute(
+                schema_version_table.select().where(schema_version_table.c.version == version)
+            ).first()
+            if already_applied:
+                continue
+            func(connection)
+            connection.execute(
+                schema_version_table.insert().values(
+                    version=version,
+                    description=description,
+                    applied_at=datetime.utcnow(),
+                )
+            )
+        applied.append((version, description))
+    return applied
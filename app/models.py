@@ -1,25 +1,39 @@
-import json
 from datetime import datetime
 
-from sqlalchemy import inspect, text
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import check_password_hash, generate_password_hash
 
+from .jsonprovider import dumps_text, loads
+from .passwords import password_hasher
+from .replica import RoutingSession
 
-db = SQLAlchemy()
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 VALID_URGENCY_LEVELS = ("Baixa", "Média", "Alta", "Crítica")
 VALID_OCCURRENCE_STATUSES = ("Novo", "Em triagem", "Encaminhado", "Concluído")
 URGENCY_SCORE = {"Baixa": 1, "Média": 2, "Alta": 3, "Crítica": 4}
 
 
+def _verify_and_upgrade(account, raw_password):
+    if not password_hasher.verify(account.password_hash, raw_password):
+        return False
+    if password_hasher.needs_rehash(account.password_hash):
+        account.password_hash = password_hasher.hash(raw_password)
+        password_hasher.record_rehash()
+    return True
+
+
 class Product(db.Model):
     __tablename__ = "products"
+    __table_args__ = (
+        # Categoria + ordem de destaque: listagem por categoria e "relacionados".
+        db.Index("ix_products_category_slug_featured_order", "category_slug", "featured_order", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     slug = db.Column(db.String(120), unique=True, nullable=False, index=True)
     name = db.Column(db.String(200), nullable=False)
-    category_slug = db.Column(db.String(40), nullable=False, index=True)
+    category_slug = db.Column(db.String(40), nullable=False)
     category_label = db.Column(db.String(80), nullable=False)
     price_cents = db.Column(db.Integer, nullable=False)
     description_short = db.Column(db.Text, nullable=False)
@@ -59,10 +73,10 @@ class User(db.Model):
     )
 
     def set_password(self, raw_password):
-        self.password_hash = generate_password_hash(raw_password)
+        self.password_hash = password_hasher.hash(raw_password)
 
     def check_password(self, raw_password):
-        return check_password_hash(self.password_hash, raw_password)
+        return _verify_and_upgrade(self, raw_password)
 
 
 class OccurrenceMapping(db.Model):
@@ -80,6 +94,11 @@ class OccurrenceMapping(db.Model):
 
 class Occurrence(db.Model):
     __tablename__ = "occurrences"
+    __table_args__ = (
+        # Filtro + ordenacao por data no mesmo indice, sem sort temporario.
+        db.Index("ix_occurrences_user_id_created_at", "user_id", "created_at"),
+        db.Index("ix_occurrences_status_created_at", "status", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -87,10 +106,10 @@ class Occurrence(db.Model):
         db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
     )
 
-    status = db.Column(db.String(30), nullable=False, default="Novo", index=True)
+    status = db.Column(db.String(30), nullable=False, default="Novo")
     mapped_category = db.Column(db.String(255), nullable=False)
     urgency_level = db.Column(db.String(20), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
 
     contact_phone = db.Column(db.String(40), nullable=True)
     contact_email = db.Column(db.String(255), nullable=True)
@@ -122,12 +141,12 @@ class Occurrence(db.Model):
     user = db.relationship("User", back_populates="occurrences")
 
     def set_items(self, items):
-        self.items_json = json.dumps(items, ensure_ascii=False)
+        self.items_json = dumps_text(items)
 
     def get_items(self):
         try:
-            return json.loads(self.items_json or "[]")
-        except (json.JSONDecodeError, TypeError):
+            return loads(self.items_json or "[]")
+        except (ValueError, TypeError):
             return []
 
 
@@ -191,10 +210,46 @@ class AdminUser(db.Model):
     status_changes = db.relationship("OccurrenceStatusHistory", back_populates="changed_by")
 
     def set_password(self, raw_password):
-        self.password_hash = generate_password_hash(raw_password)
+        self.password_hash = password_hasher.hash(raw_password)
 
     def check_password(self, raw_password):
-        return check_password_hash(self.password_hash, raw_password)
+        return _verify_and_upgrade(self, raw_password)
+
+
+class CacheVersion(db.Model):
+    __tablename__ = "cache_versions"
+
+    namespace = db.Column(db.String(60), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class OccurrenceHourlyRollup(db.Model):
+    __tablename__ = "occurrence_hourly_rollups"
+
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    mapped_category = db.Column(db.String(255), primary_key=True)
+    urgency_level = db.Column(db.String(20), primary_key=True)
+    status = db.Column(db.String(30), primary_key=True)
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    entered_count = db.Column(db.Integer, nullable=False, default=0)
+    exited_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SlowQuery(db.Model):
+    __tablename__ = "slow_queries"
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    fingerprint = db.Column(db.String(40), nullable=False, index=True)
+    statement = db.Column(db.Text, nullable=False)
+    parameters = db.Column(db.Text, nullable=True)
+    duration_ms = db.Column(db.Float, nullable=False)
+    bind = db.Column(db.String(40), nullable=False, default="primary")
+    endpoint = db.Column(db.String(120), nullable=True)
+    method = db.Column(db.String(10), nullable=True)
+    path = db.Column(db.String(255), nullable=True)
+    plan = db.Column(db.Text, nullable=True)
 
 
 DEFAULT_PRODUCTS = [
@@ -323,60 +378,3 @@ DEFAULT_PRODUCT_MAPPINGS = {
     "protetor-barreira-invisivel": ("Acompanhamento continuo", "Baixa"),
 }
 
-
-def seed_database(app_config):
-    existing_products = {item.slug: item for item in Product.query.all()}
-    created_new_products = False
-
-    for product_data in DEFAULT_PRODUCTS:
-        if product_data["slug"] in existing_products:
-            continue
-        db.session.add(Product(**product_data))
-        created_new_products = True
-
-    if created_new_products:
-        db.session.commit()
-
-    all_products = {item.slug: item for item in Product.query.all()}
-
-    for slug, product in all_products.items():
-        default_category, default_urgency = DEFAULT_PRODUCT_MAPPINGS.get(
-            slug, ("Ocorrencia geral", "Baixa")
-        )
-        mapping = OccurrenceMapping.query.filter_by(product_id=product.id).first()
-        if mapping:
-            continue
-        db.session.add(
-            OccurrenceMapping(
-                product_id=product.id,
-                occurrence_category=default_category,
-                urgency_level=default_urgency,
-            )
-        )
-
-    if not AdminUser.query.first():
-        admin_user = AdminUser(username=app_config.get("ADMIN_DEFAULT_USERNAME", "admin"))
-        admin_user.set_password(app_config.get("ADMIN_DEFAULT_PASSWORD", "admin123"))
-        db.session.add(admin_user)
-
-    if not User.query.first():
-        demo_user = User(
-            username=app_config.get("USER_DEFAULT_USERNAME", "usuario_demo"),
-            email=app_config.get("USER_DEFAULT_EMAIL", "usuario@alomana.local"),
-        )
-        demo_user.set_password(app_config.get("USER_DEFAULT_PASSWORD", "usuario123"))
-        db.session.add(demo_user)
-
-    db.session.commit()
-
-
-def migrate_schema():
-    inspector = inspect(db.engine)
-    table_names = inspector.get_table_names()
-    if "occurrences" not in table_names:
-        return
-
-    columns = {column["name"] for column in inspector.get_columns("occurrences")}
-    if "user_id" not in columns:
-        db.session.execute(text("ALTER TABLE occurrences ADD COLUMN user_id INTEGER"))
-        db.session.commit()
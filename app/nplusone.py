@@ -0,0 +1,195 @@
+import os
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import g, request
+from sqlalchemy import event
+
+from .models import db
+from .slowlog import fingerprint_statement
+
+
+NPLUSONE_MODES = ("off", "warn", "raise")
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(APP_DIR)
+
+_active_trackers = ContextVar("query_trackers", default=())
+
+
+class NPlusOneError(RuntimeError):
+    pass
+
+
+def _query_origin():
+    # Frame mais interno do app ou de um template (Jinja usa o caminho do .html).
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename != __file__:
+            lineno = frame.f_lineno
+            template = frame.f_globals.get("__jinja_template__")
+            if template is not None:
+                lineno = template.get_corresponding_lineno(lineno)
+            return f"{os.path.relpath(filename, ROOT_DIR)}:{lineno}"
+        frame = frame.f_back
+    return None
+
+
+class QueryTracker:
+    def __init__(self, capture_origins=False, capture_parameters=False):
+        self.statements = []
+        self.parameters = []
+        self.shapes = Counter()
+        self.samples = {}
+        self.origins = {}
+        self.capture_origins = capture_origins
+        self.capture_parameters = capture_parameters
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def record(self, statement, parameters=None):
+        shape = fingerprint_statement(statement)
+        self.statements.append(statement)
+        if self.capture_parameters:
+            self.parameters.append(parameters)
+        self.shapes[shape] += 1
+        self.samples.setdefault(shape, statement)
+        if self.capture_origins and self.shapes[shape] == 2:
+            self.origins[shape] = _query_origin()
+
+    def repeated(self, threshold):
+        return [
+            (self.samples[shape], calls, self.origins.get(shape))
+            for shape, calls in self.shapes.most_common()
+            if calls > threshold
+        ]
+
+    def describe(self, limit=10):
+        lines = []
+        for shape, calls in self.shapes.most_common(limit):
+            statement = " ".join(self.samples[shape].split())
+            origin = self.origins.get(shape)
+            lines.append(f"  {calls}x {statement[:160]}" + (f" ({origin})" if origin else ""))
+        return "\n".join(lines)
+
+
+def _push_tracker(tracker):
+    _active_trackers.set(_active_trackers.get() + (tracker,))
+
+
+def _pop_tracker(tracker):
+    _active_trackers.set(tuple(item for item in _active_trackers.get() if item is not tracker))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for tracker in _active_trackers.get():
+        tracker.record(statement, parameters)
+
+
+def install_query_tracking(engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def count_queries(capture_parameters=False):
+    tracker = QueryTracker(capture_parameters=capture_parameters)
+    _push_tracker(tracker)
+    try:
+        yield tracker
+    finally:
+        _pop_tracker(tracker)
+
+
+@contextmanager
+def assert_max_queries(max_queries, max_repeats=None):
+    with count_queries() as tracker:
+        yield tracker
+    if tracker.count > max_queries:
+        raise AssertionError(
+            f"{tracker.count} consultas executadas, limite {max_queries}:\n{tracker.describe()}"
+        )
+    if max_repeats is not None and tracker.repeated(max_repeats):
+        raise AssertionError(
+            f"Consulta repetida mais de {max_repeats} vezes:\n{tracker.describe()}"
+        )
+
+
+def query_budget(max_queries):
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(*args, **kwargs):
+            g.query_budget = max_queries
+            return view_func(*args, **kwargs)
+
+        # Os testes leem o mesmo numero: tests/test_query_budgets.py.
+        wrapper.query_budget = max_queries
+        return wrapper
+
+    return decorator
+
+
+class NPlusOneDetector:
+    def __init__(self):
+        self.mode = "off"
+        self.threshold = 5
+        self.logger = None
+
+    def init_app(self, app):
+        mode = app.config.get("NPLUSONE_MODE") or ("warn" if app.debug or app.testing else "off")
+        if mode not in NPLUSONE_MODES:
+            raise ValueError(f"NPLUSONE_MODE invalido: {mode}")
+        self.mode = mode
+        self.threshold = int(app.config.get("NPLUSONE_THRESHOLD", self.threshold))
+        self.logger = app.logger
+
+        # Sempre instalado: assert_max_queries funciona mesmo com o detector desligado.
+        with app.app_context():
+            for engine in db.engines.values():
+                install_query_tracking(engine)
+
+        if self.mode == "off":
+            return
+        app.before_request_funcs.setdefault(None, []).insert(0, self._start)
+        app.after_request(self._check)
+        app.teardown_request(self._stop)
+        app.extensions["nplusone_detector"] = self
+
+    def _start(self):
+        g.query_tracker = QueryTracker(capture_origins=True)
+        _push_tracker(g.query_tracker)
+
+    def _check(self, response):
+        tracker = g.get("query_tracker")
+        if tracker is None:
+            return response
+        response.headers["X-Query-Count"] = str(tracker.count)
+
+        problems = [
+            f"{calls}x {' '.join(statement.split())[:160]}" + (f" ({origin})" if origin else "")
+            for statement, calls, origin in tracker.repeated(self.threshold)
+        ]
+        budget = g.get("query_budget")
+        if budget is not None and tracker.count > budget:
+            problems.insert(0, f"{tracker.count} consultas para um orcamento de {budget}")
+        if not problems:
+            return response
+
+        message = f"Possivel N+1 em {request.endpoint}:\n  " + "\n  ".join(problems)
+        if self.mode == "raise":
+            raise NPlusOneError(message)
+        self.logger.warning(message)
+        return response
+
+    def _stop(self, exc):
+        tracker = g.pop("query_tracker", None)
+        if tracker is not None:
+            _pop_tracker(tracker)
+
+
+nplusone_detector = NPlusOneDetector()
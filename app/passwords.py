@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    from argon2 import PasswordHasher as Argon2Hasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:  # argon2-cffi is optional
+    Argon2Hasher = None
+
+
+ARGON2_PREFIX = "$argon2"
+
+
+def _build_argon2(time_cost, memory_cost, parallelism):
+    return Argon2Hasher(
+        time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )
+
+
+def _argon2_hash(raw_password, time_cost, memory_cost, parallelism):
+    return _build_argon2(time_cost, memory_cost, parallelism).hash(raw_password)
+
+
+def _argon2_verify(stored_hash, raw_password):
+    try:
+        return Argon2Hasher().verify(stored_hash, raw_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def _werkzeug_hash(raw_password, method):
+    return generate_password_hash(raw_password, method=method)
+
+
+def _werkzeug_verify(stored_hash, raw_password):
+    return check_password_hash(stored_hash, raw_password)
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.algorithm = "scrypt"
+        self.scrypt_n = 2**15
+        self.scrypt_r = 8
+        self.scrypt_p = 1
+        self.pbkdf2_iterations = 600000
+        self.argon2_time_cost = 3
+        self.argon2_memory_cost = 65536
+        self.argon2_parallelism = 1
+        self.max_workers = 2
+        self.executor_kind = "thread"
+
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._rehash_count = 0
+
+    def init_app(self, app):
+        config = app.config
+        algorithm = config.get("PASSWORD_HASH_ALGORITHM", self.algorithm).lower()
+        if algorithm == "argon2" and Argon2Hasher is None:
+            app.logger.warning("argon2-cffi nao instalado; usando scrypt para senhas.")
+            algorithm = "scrypt"
+        self.algorithm = algorithm
+        self.scrypt_n = int(config.get("PASSWORD_HASH_SCRYPT_N", self.scrypt_n))
+        self.scrypt_r = int(config.get("PASSWORD_HASH_SCRYPT_R", self.scrypt_r))
+        self.scrypt_p = int(config.get("PASSWORD_HASH_SCRYPT_P", self.scrypt_p))
+        self.pbkdf2_iterations = int(
+            config.get("PASSWORD_HASH_PBKDF2_ITERATIONS", self.pbkdf2_iterations)
+        )
+        self.argon2_time_cost = int(
+            config.get("PASSWORD_HASH_ARGON2_TIME_COST", self.argon2_time_cost)
+        )
+        self.argon2_memory_cost = int(
+            config.get("PASSWORD_HASH_ARGON2_MEMORY_COST", self.argon2_memory_cost)
+        )
+        self.argon2_parallelism = int(
+            config.get("PASSWORD_HASH_ARGON2_PARALLELISM", self.argon2_parallelism)
+        )
+        self.max_workers = max(1, int(config.get("PASSWORD_HASH_WORKERS", self.max_workers)))
+        self.executor_kind = config.get("PASSWORD_HASH_EXECUTOR", self.executor_kind).lower()
+        self.shutdown()
+        app.extensions["password_hasher"] = self
+
+    @property
+    def werkzeug_method(self):
+        if self.algorithm == "pbkdf2":
+            return f"pbkdf2:sha256:{self.pbkdf2_iterations}"
+        return f"scrypt:{self.scrypt_n}:{self.scrypt_r}:{self.scrypt_p}"
+
+    def _get_executor(self):
+        pid = os.getpid()
+        with self._lock:
+            # Pools do not survive fork; gunicorn workers build their own.
+            if self._executor is None or self._executor_pid != pid:
+                if self.executor_kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="password-hash"
+                    )
+                self._executor_pid = pid
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._executor_pid = None
+
+    def _run(self, operation, func, *args):
+        started_at = time.perf_counter()
+        try:
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._record(operation, time.perf_counter() - started_at)
+
+    def _record(self, operation, elapsed):
+        with self._lock:
+            entry = self._metrics.setdefault(
+                operation, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            entry["count"] += 1
+            entry["total_seconds"] += elapsed
+            entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+    def hash(self, raw_password):
+        if self.algorithm == "argon2":
+            return self._run(
+                "hash",
+                _argon2_hash,
+                raw_password,
+                self.argon2_time_cost,
+                self.argon2_memory_cost,
+                self.argon2_parallelism,
+            )
+        return self._run("hash", _werkzeug_hash, raw_password, self.werkzeug_method)
+
+    def verify(self, stored_hash, raw_password):
+        if not stored_hash:
+            return False
+        if stored_hash.startswith(ARGON2_PREFIX):
+            if Argon2Hasher is None:
+                return False
+            return self._run("verify", _argon2_verify, stored_hash, raw_password)
+        return self._run("verify", _werkzeug_verify, stored_hash, raw_password)
+
+    def needs_rehash(self, stored_hash):
+        if self.algorithm == "argon2":
+            if not stored_hash.startswith(ARGON2_PREFIX):
+                return True
+            return _build_argon2(
+                self.argon2_time_cost, self.argon2_memory_cost, self.argon2_parallelism
+            ).check_needs_rehash(stored_hash)
+        return stored_hash.split("$", 1)[0] != self.werkzeug_method
+
+    def record_rehash(self):
+        with self._lock:
+            self._rehash_count += 1
+
+    def metrics(self):
+        with self._lock:
+            snapshot = {operation: dict(entry) for operation, entry in self._metrics.items()}
+            snapshot["rehash_count"] = self._rehash_count
+            return snapshot
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,201 @@
+import cProfile
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+from .identity import current_admin
+from .models import db
+
+
+PROFILE_QUERY_ARG = "_profile"
+PROFILE_HEADER = "X-Profile"
+PROFILE_MODES = ("deterministic", "sampling")
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.output_dir = None
+        self.sample_rate = 0
+        self.default_mode = "deterministic"
+        self.sampling_interval = 0.005
+        self.max_files = 200
+        self._counter = itertools.count(1)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PROFILING_ENABLED", False)
+        if not self.enabled:
+            return
+        self.output_dir = app.config["PROFILING_DIR"]
+        self.sample_rate = int(app.config.get("PROFILING_SAMPLE_RATE", 0))
+        self.default_mode = app.config.get("PROFILING_MODE", self.default_mode)
+        self.sampling_interval = app.config.get("PROFILING_SAMPLING_INTERVAL_MS", 5) / 1000
+        self.max_files = int(app.config.get("PROFILING_MAX_FILES", self.max_files))
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        with app.app_context():
+            for engine in db.engines.values():
+                if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+                    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+        app.before_request_funcs.setdefault(None, []).insert(0, self._start)
+        app.after_request(self._tag_response)
+        app.teardown_request(self._finish)
+        app.extensions["request_profiler"] = self
+
+    def _requested_mode(self):
+        flag = request.args.get(PROFILE_QUERY_ARG) or request.headers.get(PROFILE_HEADER)
+        if flag:
+            # So admins podem ligar o profiler pela URL ou header.
+            if current_admin() is None:
+                return None
+            return flag if flag in PROFILE_MODES else self.default_mode
+        if self.sample_rate and next(self._counter) % self.sample_rate == 0:
+            return self.default_mode
+        return None
+
+    def _start(self):
+        mode = self._requested_mode()
+        if mode is None:
+            return
+        if mode == "sampling":
+            profiler = SamplingProfiler(self.sampling_interval)
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Outro profiler ja ativo neste processo.
+                return
+        g.profile = {
+            "mode": mode,
+            "profiler": profiler,
+            "started_at": time.perf_counter(),
+            "sql": [],
+            "id": self._profile_id(),
+        }
+
+    def _profile_id(self):
+        endpoint = re.sub(r"[^A-Za-z0-9_.-]", "_", request.endpoint or "nao_encontrado")
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        return f"{timestamp}-{endpoint}-{os.getpid()}"
+
+    def _tag_response(self, response):
+        profile = g.get("profile")
+        if profile is not None:
+            profile["status"] = response.status_code
+            response.headers["X-Profile-Id"] = profile["id"]
+        return response
+
+    def _finish(self, exc):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return
+        profiler = profile["profiler"]
+        elapsed = time.perf_counter() - profile["started_at"]
+        base_path = os.path.join(self.output_dir, profile["id"])
+        if profile["mode"] == "sampling":
+            profiler.stop()
+            profiler.dump(f"{base_path}.collapsed")
+        else:
+            profiler.disable()
+            profiler.dump_stats(f"{base_path}.pstats")
+
+        with open(f"{base_path}.json", "w", encoding="utf-8") as handle:
+            json.dump(
+                {
+                    "id": profile["id"],
+                    "mode": profile["mode"],
+                    "method": request.method,
+                    "path": request.full_path.rstrip("?"),
+                    "endpoint": request.endpoint,
+                    "status": profile.get("status", 500 if exc else None),
+                    "elapsed_ms": round(elapsed * 1000, 3),
+                    "sql_count": len(profile["sql"]),
+                    "sql_ms": round(sum(entry["elapsed_ms"] for entry in profile["sql"]), 3),
+                    "sql": profile["sql"],
+                },
+                handle,
+                indent=2,
+            )
+        self._prune()
+
+    def _prune(self):
+        if not self.max_files:
+            return
+        reports = sorted(
+            entry for entry in os.listdir(self.output_dir) if entry.endswith(".json")
+        )
+        for report in reports[: max(0, len(reports) - self.max_files)]:
+            stem = report[: -len(".json")]
+            for suffix in (".json", ".pstats", ".collapsed"):
+                try:
+                    os.remove(os.path.join(self.output_dir, stem + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and "profile" in g:
+        conn.info.setdefault("profile_query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("profile_query_started_at")
+    if not started or not has_app_context() or "profile" not in g:
+        return
+    g.profile["sql"].append(
+        {
+            "statement": statement,
+            "elapsed_ms": round((time.perf_counter() - started.pop()) * 1000, 3),
+            "executemany": executemany,
+            "rowcount": cursor.rowcount,
+        }
+    )
+
+
+request_profiler = RequestProfiler()
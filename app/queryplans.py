@@ -0,0 +1,147 @@
+import re
+
+from sqlalchemy import select
+
+from .identity import ADMIN_SESSION_KEY, USER_SESSION_KEY
+from .models import AdminUser, Occurrence, Product, db
+from .nplusone import count_queries
+from .slowlog import explain_plan
+
+
+# Cada rota quente, a consulta que importa e o indice que ela deve usar.
+PLAN_CHECKS = (
+    {
+        "endpoint": "user.orders_page",
+        "path": "/meus-pedidos",
+        "login": "user",
+        "match": "occurrences.user_id = ",
+        "table": "occurrences",
+        "index": "ix_occurrences_user_id_created_at",
+    },
+    {
+        "endpoint": "admin.occurrences_page",
+        "path": "/admin/ocorrencias?status=Novo",
+        "login": "admin",
+        "match": "occurrences.status = ",
+        "table": "occurrences",
+        "index": "ix_occurrences_status_created_at",
+    },
+    {
+        "endpoint": "store.product_detail_page",
+        "path": "/produto/{product_slug}",
+        "login": None,
+        "match": "products.category_slug = ",
+        "table": "products",
+        "index": "ix_products_category_slug_featured_order",
+    },
+    {
+        "endpoint": "store.category_page",
+        "path": "/categoria/{category_slug}",
+        "login": None,
+        "match": "products.category_slug = ",
+        "table": "products",
+        "index": "ix_products_category_slug_featured_order",
+    },
+)
+
+_POSTGRES_SORT_PATTERN = re.compile(r"^\s*(?:->\s*)?(?:Incremental )?Sort\b", re.MULTILINE)
+
+
+class PlanCheckError(Exception):
+    pass
+
+
+def _fixtures():
+    product = db.session.scalars(
+        select(Product).where(Product.active.is_(True)).order_by(Product.id).limit(1)
+    ).first()
+    fixtures = {
+        "user_id": db.session.scalar(
+            select(Occurrence.user_id).where(Occurrence.user_id.isnot(None)).limit(1)
+        ),
+        "admin_id": db.session.scalar(select(AdminUser.id).order_by(AdminUser.id).limit(1)),
+        "product_slug": product.slug if product else None,
+        "category_slug": product.category_slug if product else None,
+    }
+    missing = [name for name, value in fixtures.items() if value is None]
+    if missing:
+        raise PlanCheckError(
+            "Banco sem dados para as rotas verificadas "
+            f"({', '.join(missing)}); rode `flask db generate` antes."
+        )
+    return fixtures
+
+
+def plan_problems(dialect_name, plan, check):
+    table = check["table"]
+    problems = []
+    if check["index"] not in plan:
+        problems.append(f"indice {check['index']} nao usado")
+    if dialect_name == "sqlite":
+        if re.search(rf"\bSCAN {table}\b(?! USING)", plan):
+            problems.append(f"varredura completa de {table}")
+        if "USE TEMP B-TREE" in plan:
+            problems.append("ordenacao em B-tree temporaria")
+    else:
+        if f"Seq Scan on {table}" in plan:
+            problems.append(f"varredura completa de {table}")
+        if _POSTGRES_SORT_PATTERN.search(plan):
+            problems.append("ordenacao fora do indice")
+    return problems
+
+
+def _explain(statement, parameters):
+    with db.engine.connect() as connection:
+        with connection.begin():
+            if connection.dialect.name == "postgresql":
+                # Tabelas pequenas de teste sempre dariam Seq Scan; o que importa e o indice servir.
+                connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            return explain_plan(connection, statement, parameters)
+
+
+def _client_for(app, login, fixtures):
+    client = app.test_client()
+    if login is not None:
+        with client.session_transaction() as session:
+            if login == "admin":
+                session[ADMIN_SESSION_KEY] = fixtures["admin_id"]
+            else:
+                session[USER_SESSION_KEY] = fixtures["user_id"]
+    return client
+
+
+def run_plan_checks(app, checks=PLAN_CHECKS):
+    with app.app_context():
+        fixtures = _fixtures()
+        dialect_name = db.engine.dialect.name
+
+    results = []
+    for check in checks:
+        path = check["path"].format(**fixtures)
+        client = _client_for(app, check["login"], fixtures)
+        # Contexto novo por rota: sob o CLI, as requisicoes herdariam o mesmo g.
+        with app.app_context(), count_queries(capture_parameters=True) as tracker:
+            response = client.get(path)
+
+        result = {"check": check, "path": path, "statement": None, "plan": None, "problems": []}
+        results.append(result)
+        if response.status_code != 200:
+            result["problems"].append(f"{path} respondeu HTTP {response.status_code}")
+            continue
+        executions = [
+            (statement, parameters)
+            for statement, parameters in zip(tracker.statements, tracker.parameters)
+            if check["match"] in statement and "ORDER BY" in statement
+        ]
+        if not executions:
+            # A consulta mudou de forma; a verificacao precisa ser revista junto.
+            result["problems"].append(f"nenhuma consulta com '{check['match']}' e ORDER BY")
+            continue
+
+        statement, parameters = executions[0]
+        with app.app_context():
+            plan = _explain(statement, parameters)
+        result["statement"] = statement
+        result["plan"] = plan
+        result["problems"] = plan_problems(dialect_name, plan, check)
+    return results
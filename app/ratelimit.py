@@ -0,0 +1,193 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, request
+
+
+RATE_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(raw_rate):
+    count, _, period = (raw_rate or "").partition("/")
+    try:
+        capacity = int(count)
+    except ValueError:
+        return None
+    seconds = RATE_PERIODS.get(period.strip().lower())
+    if capacity <= 0 or not seconds:
+        return None
+    return capacity, capacity / seconds
+
+
+def _refill(tokens, updated_at, now, capacity, refill_rate):
+    return min(capacity, tokens + (now - updated_at) * refill_rate)
+
+
+class MemoryBackend:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = _refill(tokens, updated_at, now, capacity, refill_rate)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / refill_rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+
+class SQLiteBackend:
+    PURGE_EVERY = 1000
+    PURGE_AFTER_SECONDS = 86400
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        pid = os.getpid()
+        if connection is None or getattr(self._local, "pid", None) != pid:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = pid
+        return connection
+
+    def consume(self, key, capacity, refill_rate, now=None):
+        now = time.time() if now is None else now
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens = capacity if row is None else _refill(row[0], row[1], now, capacity, refill_rate)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / refill_rate
+            connection.execute(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, "
+                "updated_at = excluded.updated_at",
+                (key, tokens, now),
+            )
+            self._calls += 1
+            if self._calls % self.PURGE_EVERY == 0:
+                connection.execute(
+                    "DELETE FROM rate_limit_buckets WHERE updated_at < ?",
+                    (now - self.PURGE_AFTER_SECONDS,),
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+
+class RateLimiter:
+    def __init__(self):
+        self.enabled = True
+        self.rules = {}
+        self.backend = MemoryBackend()
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get("RATE_LIMIT_ENABLED", True))
+        self.rules = {}
+        self._counters = {}
+        for scope, limits in app.config.get("RATE_LIMIT_RULES", {}).items():
+            parsed = {}
+            for dimension, raw_rate in limits.items():
+                rate = parse_rate(raw_rate)
+                if rate:
+                    parsed[dimension] = rate
+            self.rules[scope] = parsed
+
+        if app.config.get("RATE_LIMIT_BACKEND", "memory") == "sqlite":
+            self.backend = SQLiteBackend(app.config["RATE_LIMIT_SQLITE_PATH"])
+        else:
+            self.backend = MemoryBackend()
+        app.extensions["rate_limiter"] = self
+
+    def _count(self, scope, outcome):
+        with self._lock:
+            counters = self._counters.setdefault(scope, {"allowed": 0, "rejected": 0})
+            counters[outcome] += 1
+
+    def metrics(self):
+        with self._lock:
+            return {scope: dict(counters) for scope, counters in self._counters.items()}
+
+    def check(self, scope, account=None):
+        limits = self.rules.get(scope, {})
+        keys = []
+        if "ip" in limits:
+            keys.append(("ip", f"{scope}:ip:{request.remote_addr or '-'}"))
+        if "account" in limits and account:
+            keys.append(("account", f"{scope}:account:{str(account).strip().lower()}"))
+
+        retry_after = 0.0
+        for dimension, key in keys:
+            capacity, refill_rate = limits[dimension]
+            retry_after = max(retry_after, self.backend.consume(key, capacity, refill_rate))
+        return retry_after
+
+    def limit(self, scope, account=None, methods=("POST",)):
+        def decorator(view_func):
+            @wraps(view_func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method not in methods:
+                    return view_func(*args, **kwargs)
+
+                retry_after = self.check(scope, account() if account else None)
+                if retry_after > 0:
+                    self._count(scope, "rejected")
+                    current_app.logger.info("Rate limit atingido para %s.", scope)
+                    return too_many_requests(retry_after)
+
+                self._count(scope, "allowed")
+                return view_func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+
+def too_many_requests(retry_after):
+    return Response(
+        "Muitas tentativas em pouco tempo. Aguarde alguns instantes e tente novamente.",
+        status=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        mimetype="text/plain",
+    )
+
+
+rate_limiter = RateLimiter()
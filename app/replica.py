@@ -0,0 +1,75 @@
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+
+REPLICA_BIND_KEY = "replica"
+REPLICA_PIN_SESSION_KEY = "_replica_pin_until"
+_WROTE_INFO_KEY = "replica_wrote"
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._routes_to_replica(clause):
+            return self._db.engines[REPLICA_BIND_KEY]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _routes_to_replica(self, clause):
+        if self._flushing or self.info.get(_WROTE_INFO_KEY):
+            return False
+        if clause is not None and not getattr(clause, "is_select", False):
+            return False
+        if not has_app_context() or REPLICA_BIND_KEY not in self._db.engines:
+            return False
+        if clause is not None:
+            requested = clause.get_execution_options().get("replica")
+            if requested is not None:
+                return requested
+        return g.get("db_read_replica", False)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_write(db_session, flush_context):
+    db_session.info[_WROTE_INFO_KEY] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_commit(db_session):
+    if db_session.info.pop(_WROTE_INFO_KEY, False) and has_request_context():
+        g.db_committed_write = True
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_write(db_session):
+    db_session.info.pop(_WROTE_INFO_KEY, None)
+
+
+def _is_pinned_to_primary():
+    return session.get(REPLICA_PIN_SESSION_KEY, 0) > time.time()
+
+
+def route_request_reads():
+    if REPLICA_BIND_KEY not in current_app.config.get("SQLALCHEMY_BINDS", {}):
+        return
+    g.db_read_replica = (
+        request.method in ("GET", "HEAD")
+        and request.blueprint in current_app.config.get("REPLICA_READ_BLUEPRINTS", ())
+        and not _is_pinned_to_primary()
+    )
+
+
+def pin_after_write(response):
+    if g.get("db_committed_write") and REPLICA_BIND_KEY in current_app.config.get(
+        "SQLALCHEMY_BINDS", {}
+    ):
+        session[REPLICA_PIN_SESSION_KEY] = time.time() + current_app.config.get(
+            "REPLICA_PIN_SECONDS", 5
+        )
+    return response
+
+
+def init_replica_routing(app):
+    app.before_request(route_request_reads)
+    app.after_request(pin_after_write)
@@ -0,0 +1,239 @@
+import calendar
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, event, func, select
+
+from .engine import upsert_statement
+from .models import Occurrence, OccurrenceHourlyRollup, OccurrenceStatusHistory, db
+from .replica import RoutingSession
+
+
+ROLLUP_KEY_COLUMNS = ["bucket_start", "mapped_category", "urgency_level", "status"]
+ROLLUP_COUNT_COLUMNS = ["created_count", "entered_count", "exited_count"]
+ROLLUP_METRICS = {
+    "criadas": "created_count",
+    "entradas": "entered_count",
+    "saidas": "exited_count",
+}
+ROLLUP_GROUPS = {
+    "categoria": "mapped_category",
+    "urgencia": "urgency_level",
+    "status": "status",
+}
+GRANULARITIES = {"hora": timedelta(hours=1), "dia": timedelta(days=1)}
+REBUILD_BATCH_SIZE = 5000
+
+
+class RollupError(Exception):
+    pass
+
+
+def hour_floor(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def hour_ceil(moment):
+    floor = hour_floor(moment)
+    return floor if floor == moment else floor + timedelta(hours=1)
+
+
+def to_epoch_ms(moment):
+    # Datas do banco sao UTC sem fuso (datetime.utcnow).
+    return calendar.timegm(moment.utctimetuple()) * 1000
+
+
+def _status_deltas(changes):
+    # Cada mudanca de status entra no status novo e sai do anterior; sem anterior e criacao.
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for changed_at, mapped_category, urgency_level, previous_status, new_status in changes:
+        bucket = hour_floor(changed_at)
+        entered = deltas[(bucket, mapped_category, urgency_level, new_status)]
+        entered[1] += 1
+        if previous_status is None:
+            entered[0] += 1
+        else:
+            deltas[(bucket, mapped_category, urgency_level, previous_status)][2] += 1
+    return deltas
+
+
+def _delta_rows(deltas):
+    return [
+        dict(
+            zip(ROLLUP_KEY_COLUMNS, key),
+            created_count=counts[0],
+            entered_count=counts[1],
+            exited_count=counts[2],
+        )
+        for key, counts in deltas.items()
+    ]
+
+
+def apply_status_changes(connection, changes):
+    rows = _delta_rows(_status_deltas(changes))
+    if rows:
+        connection.execute(
+            upsert_statement(
+                connection,
+                OccurrenceHourlyRollup.__table__,
+                ROLLUP_KEY_COLUMNS,
+                ROLLUP_COUNT_COLUMNS,
+                increment=True,
+            ),
+            rows,
+        )
+    return len(rows)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _roll_up_new_history(db_session, flush_context):
+    histories = [obj for obj in db_session.new if isinstance(obj, OccurrenceStatusHistory)]
+    if not histories:
+        return
+    changes = []
+    with db_session.no_autoflush:
+        for history in histories:
+            occurrence = history.occurrence or db_session.get(Occurrence, history.occurrence_id)
+            changes.append(
+                (
+                    history.changed_at,
+                    occurrence.mapped_category,
+                    occurrence.urgency_level,
+                    history.previous_status,
+                    history.new_status,
+                )
+            )
+    # Mesma transacao do flush: o rollup nunca fica a frente nem atras do historico.
+    apply_status_changes(db_session.connection(), changes)
+
+
+def _hour_bucket(connection, column):
+    if connection.dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+    return func.date_trunc("hour", column)
+
+
+def _parse_bucket(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def rebuild_rollups(connection, start=None, end=None):
+    history = OccurrenceStatusHistory.__table__
+    occurrences = Occurrence.__table__
+    rollups = OccurrenceHourlyRollup.__table__
+    start = hour_floor(start) if start else None
+    end = hour_ceil(end) if end else None
+
+    bucket = _hour_bucket(connection, history.c.changed_at).label("bucket")
+    is_creation = case((history.c.previous_status.is_(None), 1), else_=0)
+    base = select().select_from(
+        history.join(occurrences, occurrences.c.id == history.c.occurrence_id)
+    )
+    if start:
+        base = base.where(history.c.changed_at >= start)
+    if end:
+        base = base.where(history.c.changed_at < end)
+
+    deltas = defaultdict(lambda: [0, 0, 0])
+    entered = base.add_columns(
+        bucket,
+        occurrences.c.mapped_category,
+        occurrences.c.urgency_level,
+        history.c.new_status,
+        func.sum(is_creation),
+        func.count(),
+    ).group_by(bucket, occurrences.c.mapped_category, occurrences.c.urgency_level, history.c.new_status)
+    for bucket_value, category, urgency, status, created, count in connection.execute(entered):
+        counts = deltas[(_parse_bucket(bucket_value), category, urgency, status)]
+        counts[0] += created or 0
+        counts[1] += count
+
+    exited = (
+        base.add_columns(
+            bucket,
+            occurrences.c.mapped_category,
+            occurrences.c.urgency_level,
+            history.c.previous_status,
+            func.count(),
+        )
+        .where(history.c.previous_status.isnot(None))
+        .group_by(
+            bucket, occurrences.c.mapped_category, occurrences.c.urgency_level, history.c.previous_status
+        )
+    )
+    for bucket_value, category, urgency, status, count in connection.execute(exited):
+        deltas[(_parse_bucket(bucket_value), category, urgency, status)][2] += count
+
+    cleanup = delete(rollups)
+    if start:
+        cleanup = cleanup.where(rollups.c.bucket_start >= start)
+    if end:
+        cleanup = cleanup.where(rollups.c.bucket_start < end)
+    connection.execute(cleanup)
+
+    rows = _delta_rows(deltas)
+    for offset in range(0, len(rows), REBUILD_BATCH_SIZE):
+        connection.execute(rollups.insert(), rows[offset : offset + REBUILD_BATCH_SIZE])
+    return len(rows)
+
+
+def _bucket_for(moment, granularity):
+    if granularity == "dia":
+        return moment.replace(hour=0)
+    return moment
+
+
+def rollup_series(start, end, granularity="hora", metric="criadas", group_by="status", filters=None):
+    if granularity not in GRANULARITIES:
+        raise RollupError(f"Granularidade invalida: {granularity}.")
+    if metric not in ROLLUP_METRICS:
+        raise RollupError(f"Metrica invalida: {metric}.")
+    if group_by not in ROLLUP_GROUPS:
+        raise RollupError(f"Agrupamento invalido: {group_by}.")
+
+    start = _bucket_for(hour_floor(start), granularity)
+    try:
+        end = hour_ceil(end)
+    except OverflowError:
+        raise RollupError("O fim do periodo passa do maior ano suportado.") from None
+    if end <= start:
+        raise RollupError("O fim do periodo precisa ser depois do inicio.")
+
+    table = OccurrenceHourlyRollup.__table__
+    group_column = table.c[ROLLUP_GROUPS[group_by]]
+    value = func.sum(table.c[ROLLUP_METRICS[metric]])
+    query = (
+        select(table.c.bucket_start, group_column, value)
+        .where(table.c.bucket_start >= start, table.c.bucket_start < end)
+        .group_by(table.c.bucket_start, group_column)
+    )
+    for name, raw_value in (filters or {}).items():
+        if raw_value:
+            query = query.where(table.c[ROLLUP_GROUPS[name]] == raw_value)
+
+    step = GRANULARITIES[granularity]
+    series = defaultdict(lambda: defaultdict(int))
+    for bucket_start, key, total in db.session.execute(query):
+        series[key][_bucket_for(bucket_start, granularity)] += total or 0
+
+    # Serie densa: os paineis nao precisam adivinhar os intervalos sem ocorrencias.
+    # Conta os passos antes: somar um passo alem do fim estouraria perto de datetime.max.
+    points = [start + step * index for index in range(-(-(end - start) // step))]
+    return {
+        "start_ms": to_epoch_ms(start),
+        "end_ms": to_epoch_ms(end),
+        "granularity": granularity,
+        "step_ms": int(step.total_seconds() * 1000),
+        "metric": metric,
+        "group_by": group_by,
+        "series": [
+            {
+                "key": key,
+                "total": sum(values.values()),
+                "points": [[to_epoch_ms(moment), values.get(moment, 0)] for moment in points],
+            }
+            for key, values in sorted(series.items(), key=lambda item: str(item[0]))
+        ],
+    }
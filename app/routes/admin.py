@@ -8,41 +8,37 @@ from flask import (
     redirect,
     render_template,
     request,
-    session,
     url_for,
 )
 from sqlalchemy import or_
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
 
+from app.identity import current_admin, login_admin, logout_admin
+from app.invalidation import MAPPINGS_NAMESPACE, invalidation_bus
 from app.models import (
     AdminUser,
     Occurrence,
     OccurrenceMapping,
     OccurrenceNote,
     OccurrenceStatusHistory,
+    OccurrenceUserMessage,
     Product,
     User,
     VALID_OCCURRENCE_STATUSES,
     VALID_URGENCY_LEVELS,
     db,
 )
+from app.nplusone import query_budget
+from app.ratelimit import rate_limiter
+from app.slowlog import slow_query_log, top_offenders
 
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
-ADMIN_SESSION_KEY = "admin_user_id"
-
-
-def _current_admin():
-    admin_user_id = session.get(ADMIN_SESSION_KEY)
-    if not admin_user_id:
-        return None
-    return db.session.get(AdminUser, admin_user_id)
-
-
 def admin_required(view_func):
     @wraps(view_func)
     def wrapper(*args, **kwargs):
-        admin_user = _current_admin()
+        admin_user = current_admin()
         if not admin_user:
             next_path = request.path
             return redirect(url_for("admin.login_page", next=next_path))
@@ -53,8 +49,9 @@ def admin_required(view_func):
 
 
 @admin_bp.route("/login", methods=["GET", "POST"])
+@rate_limiter.limit("admin_login", account=lambda: request.form.get("username"))
 def login_page():
-    if _current_admin():
+    if current_admin():
         return redirect(url_for("admin.occurrences_page"))
 
     if request.method == "POST":
@@ -64,8 +61,9 @@ def login_page():
 
         admin_user = AdminUser.query.filter_by(username=username).first()
         if admin_user and admin_user.check_password(password):
-            session[ADMIN_SESSION_KEY] = admin_user.id
-            session.modified = True
+            if db.session.is_modified(admin_user):
+                db.session.commit()
+            login_admin(admin_user)
             flash("Login realizado com sucesso.", "success")
 
             if next_path.startswith("/"):
@@ -79,19 +77,21 @@ def login_page():
 
 @admin_bp.route("/logout", methods=["POST"])
 def logout():
-    session.pop(ADMIN_SESSION_KEY, None)
-    session.modified = True
+    logout_admin()
     flash("Sessao encerrada.", "success")
     return redirect(url_for("admin.login_page"))
 
 
 @admin_bp.route("/ocorrencias")
 @admin_required
+@query_budget(3)
 def occurrences_page():
     status_filter = (request.args.get("status") or "").strip()
     search_term = (request.args.get("q") or "").strip()
 
-    query = Occurrence.query.outerjoin(User, Occurrence.user_id == User.id)
+    query = Occurrence.query.outerjoin(User, Occurrence.user_id == User.id).options(
+        contains_eager(Occurrence.user)
+    )
 
     if status_filter in VALID_OCCURRENCE_STATUSES:
         query = query.filter(Occurrence.status == status_filter)
@@ -126,8 +126,18 @@ def occurrences_page():
 
 @admin_bp.route("/ocorrencias/<int:occurrence_id>")
 @admin_required
+@query_budget(6)
 def occurrence_detail_page(occurrence_id):
-    occurrence = Occurrence.query.get_or_404(occurrence_id)
+    occurrence = (
+        Occurrence.query.options(
+            joinedload(Occurrence.user),
+            selectinload(Occurrence.notes).joinedload(OccurrenceNote.admin_user),
+            selectinload(Occurrence.histories).joinedload(OccurrenceStatusHistory.changed_by),
+            selectinload(Occurrence.user_messages).joinedload(OccurrenceUserMessage.user),
+        )
+        .filter_by(id=occurrence_id)
+        .first_or_404()
+    )
     return render_template(
         "admin/occurrence_detail.html",
         occurrence=occurrence,
@@ -186,8 +196,10 @@ def occurrence_add_note(occurrence_id):
     return redirect(url_for("admin.occurrence_detail_page", occurrence_id=occurrence.id))
 
 
+# POST: admin, produto, mapeamento e os dois UPDATEs (5), mais a checagem periodica de versoes.
 @admin_bp.route("/mapeamentos", methods=["GET", "POST"])
 @admin_required
+@query_budget(6)
 def mappings_page():
     if request.method == "POST":
         product_id = request.form.get("product_id", type=int)
@@ -213,12 +225,15 @@ def mappings_page():
 
         mapping.occurrence_category = occurrence_category
         mapping.urgency_level = urgency_level
+        invalidation_bus.publish(MAPPINGS_NAMESPACE)
         db.session.commit()
         flash("Mapeamento atualizado.", "success")
         return redirect(url_for("admin.mappings_page"))
 
-    products = Product.query.filter(Product.active.is_(True)).order_by(
-        Product.category_slug.asc(), Product.name.asc()
+    products = (
+        Product.query.options(joinedload(Product.mapping))
+        .filter(Product.active.is_(True))
+        .order_by(Product.category_slug.asc(), Product.name.asc())
     )
     return render_template(
         "admin/mappings.html",
@@ -227,3 +242,20 @@ def mappings_page():
         active_nav="admin",
         admin_user=g.admin_user,
     )
+
+
+@admin_bp.route("/consultas-lentas")
+@admin_required
+@query_budget(3)
+def slow_queries_page():
+    days = request.args.get("dias", type=int) or None
+    return render_template(
+        "admin/slow_queries.html",
+        offenders=top_offenders(limit=25, days=days),
+        days=days,
+        threshold_ms=slow_query_log.threshold * 1000,
+        enabled=slow_query_log.enabled,
+        dropped=slow_query_log.dropped,
+        active_nav="admin",
+        admin_user=g.admin_user,
+    )
@@ -1,9 +1,11 @@
-from datetime import datetime
+import hmac
+from datetime import datetime, timedelta, timezone
 
-from flask import Blueprint, jsonify, request
-from sqlalchemy import or_
+from flask import Blueprint, current_app, get_flashed_messages, jsonify, request, url_for
 
-from app.models import Product
+from app.catalog import api_products_payload, health_payload
+from app.identity import cart_items_count, current_admin, current_user
+from app.rollups import ROLLUP_GROUPS, RollupError, rollup_series
 
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
@@ -11,30 +13,105 @@ api_bp = Blueprint("api", __name__, url_prefix="/api")
 
 @api_bp.get("/health")
 def healthcheck():
-    return jsonify({"status": "ok", "timestamp": datetime.utcnow().isoformat() + "Z"})
+    return jsonify(health_payload())
 
 
 @api_bp.get("/produtos")
 def list_products():
     search_term = (request.args.get("q") or "").strip()
-    query = Product.query.filter(Product.active.is_(True))
+    return current_app.response_class(
+        api_products_payload(search_term), mimetype=current_app.json.mimetype
+    )
 
-    if search_term:
-        like_term = f"%{search_term}%"
-        query = query.filter(
-            or_(Product.name.ilike(like_term), Product.description_short.ilike(like_term))
-        )
 
-    products = query.order_by(Product.featured_order.asc(), Product.id.asc()).all()
-    payload = [
+@api_bp.get("/sessao")
+def session_summary():
+    user = current_user()
+    admin_user = current_admin()
+    response = jsonify(
         {
-            "id": product.id,
-            "slug": product.slug,
-            "name": product.name,
-            "category": product.category_slug,
-            "price_cents": product.price_cents,
-            "image": product.image_filename,
+            "user": {"username": user.username} if user else None,
+            "admin": admin_user is not None,
+            "cart_items_count": cart_items_count(),
+            "messages": get_flashed_messages(with_categories=True),
+            "urls": {
+                "orders": url_for("user.orders_page"),
+                "logout": url_for("user.logout"),
+                "login": url_for("user.login_page"),
+                "register": url_for("user.register_page"),
+                "admin": url_for(
+                    "admin.occurrences_page" if admin_user else "admin.login_page"
+                ),
+            },
         }
-        for product in products
-    ]
-    return jsonify(payload)
+    )
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def _reports_authorized():
+    token = current_app.config.get("REPORTS_TOKEN")
+    authorization = request.headers.get("Authorization", "")
+    if token and authorization.startswith("Bearer "):
+        return hmac.compare_digest(authorization[7:].strip(), token)
+    return current_admin() is not None
+
+
+def _report_moment(name):
+    raw_value = (request.args.get(name) or "").strip()
+    if not raw_value:
+        return None
+    try:
+        if raw_value.isdigit():
+            # Mesma unidade da resposta: epoch em milissegundos, UTC.
+            moment = datetime.fromtimestamp(int(raw_value) / 1000, timezone.utc)
+        else:
+            moment = datetime.fromisoformat(raw_value.removesuffix("Z"))
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    except (ValueError, OverflowError, OSError):
+        raise RollupError(f"Data invalida em {name}: {raw_value!r}.") from None
+    return moment
+
+
+def _report_error(message, status=400):
+    response = jsonify({"error": message})
+    response.status_code = status
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@api_bp.get("/relatorios/ocorrencias")
+def occurrence_report():
+    if not _reports_authorized():
+        response = _report_error("Acesso restrito.", 401)
+        response.headers["WWW-Authenticate"] = 'Bearer realm="reports"'
+        return response
+
+    config = current_app.config
+    granularity = request.args.get("granularidade", "hora")
+    try:
+        end = _report_moment("fim") or datetime.utcnow()
+        start = _report_moment("inicio")
+        if start is None:
+            try:
+                start = end - timedelta(days=config["REPORTS_DEFAULT_DAYS"])
+            except OverflowError:
+                raise RollupError("Data invalida em fim: anterior ao menor ano suportado.") from None
+        max_days = config["REPORTS_MAX_DAILY_DAYS" if granularity == "dia" else "REPORTS_MAX_HOURLY_DAYS"]
+        if end - start > timedelta(days=max_days):
+            raise RollupError(f"Periodo maximo para granularidade {granularity}: {max_days} dias.")
+        payload = rollup_series(
+            start,
+            end,
+            granularity=granularity,
+            metric=request.args.get("metrica", "criadas"),
+            group_by=request.args.get("agrupar", "status"),
+            filters={name: request.args.get(name) for name in ROLLUP_GROUPS},
+        )
+    except RollupError as exc:
+        return _report_error(str(exc))
+
+    response = jsonify(payload)
+    response.headers["Cache-Control"] = f"private, max-age={config['REPORTS_CACHE_SECONDS']}"
+    return response
@@ -0,0 +1,30 @@
+import hmac
+
+from flask import Blueprint, Response, abort, current_app, request
+
+from app.identity import current_admin
+from app.metrics import metrics
+
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+def _authorized():
+    token = current_app.config.get("METRICS_TOKEN")
+    authorization = request.headers.get("Authorization", "")
+    if token and authorization.startswith("Bearer "):
+        return hmac.compare_digest(authorization[7:].strip(), token)
+    return current_admin() is not None
+
+
+@metrics_bp.get("/metrics")
+def metrics_page():
+    if not current_app.config.get("METRICS_ENABLED", True):
+        abort(404)
+    if not _authorized():
+        response = Response("Acesso restrito.\n", status=401, mimetype="text/plain")
+        response.headers["WWW-Authenticate"] = 'Bearer realm="metrics"'
+        return response
+    response = Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+    response.headers["Cache-Control"] = "no-store"
+    return response
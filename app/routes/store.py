@@ -10,22 +10,29 @@ from flask import (
 )
 from sqlalchemy import or_
 
+from app.alerts import CRITICAL_ALERT_TASK
+from app.identity import (
+    CART_SESSION_KEY,
+    USER_SESSION_KEY,
+    current_user,
+    reset_cart_summary,
+)
 from app.models import (
     URGENCY_SCORE,
     Occurrence,
     OccurrenceMapping,
     OccurrenceStatusHistory,
     Product,
-    User,
     db,
 )
+from app.nplusone import query_budget
+from app.ratelimit import rate_limiter
+from app.tasks import task_runner
 
 
 store_bp = Blueprint("store", __name__)
 
-CART_SESSION_KEY = "cart"
 AUTO_COUPON_CODE = "CUIDADO100"
-USER_SESSION_KEY = "user_id"
 
 CATEGORY_PAGE_COPY = {
     "kits": {
@@ -104,12 +111,14 @@ def _get_cart_dict():
     if cleaned_cart != raw_cart:
         session[CART_SESSION_KEY] = cleaned_cart
         session.modified = True
+        reset_cart_summary()
     return cleaned_cart
 
 
 def _save_cart(cart):
     session[CART_SESSION_KEY] = cart
     session.modified = True
+    reset_cart_summary()
 
 
 def _build_cart_lines():
@@ -167,11 +176,41 @@ def _load_products(search_term="", category_slug="", order_code="mais-vendidos")
     return query.all()
 
 
-def _current_user():
-    user_id = session.get(USER_SESSION_KEY)
-    if not user_id:
-        return None
-    return db.session.get(User, user_id)
+def _classify_cart_lines(cart_lines):
+    product_ids = [line["product"].id for line in cart_lines]
+    mappings = OccurrenceMapping.query.filter(OccurrenceMapping.product_id.in_(product_ids)).all()
+    mappings_by_product_id = {mapping.product_id: mapping for mapping in mappings}
+
+    categories = []
+    highest_urgency = "Baixa"
+
+    items_snapshot = []
+    for line in cart_lines:
+        product = line["product"]
+        mapping = mappings_by_product_id.get(product.id)
+        if mapping:
+            categories.append(mapping.occurrence_category)
+            mapping_urgency = (
+                mapping.urgency_level if mapping.urgency_level in URGENCY_SCORE else "Baixa"
+            )
+            if URGENCY_SCORE[mapping_urgency] > URGENCY_SCORE[highest_urgency]:
+                highest_urgency = mapping_urgency
+        else:
+            categories.append("Ocorrencia geral")
+
+        items_snapshot.append(
+            {
+                "product_id": product.id,
+                "product_name": product.name,
+                "category_slug": product.category_slug,
+                "quantity": line["quantity"],
+                "unit_price_cents": product.price_cents,
+                "line_total_cents": line["line_total_cents"],
+            }
+        )
+
+    mapped_category = ", ".join(list(dict.fromkeys(categories))) or "Ocorrencia geral"
+    return mapped_category, highest_urgency, items_snapshot
 
 
 @store_bp.route("/")
@@ -240,6 +279,7 @@ def maquiagem_page():
 
 
 @store_bp.route("/produto/<slug>")
+@query_budget(4)
 def product_detail_page(slug):
     product = Product.query.filter_by(slug=slug, active=True).first_or_404()
     related_products = (
@@ -341,7 +381,7 @@ def checkout_page():
         flash("Seu carrinho esta vazio.", "warning")
         return redirect(url_for("store.products_page"))
 
-    user = _current_user()
+    user = current_user()
     if not user:
         flash("Faca login para acompanhar seu pedido.", "warning")
         return redirect(url_for("user.login_page", next=url_for("store.checkout_page")))
@@ -361,13 +401,14 @@ def checkout_page():
 
 
 @store_bp.route("/checkout/finalizar", methods=["POST"])
+@rate_limiter.limit("checkout", account=lambda: session.get(USER_SESSION_KEY))
 def checkout_finalize():
     cart_lines, subtotal_cents = _build_cart_lines()
     if not cart_lines:
         flash("Seu carrinho esta vazio.", "warning")
         return redirect(url_for("store.products_page"))
 
-    user = _current_user()
+    user = current_user()
     if not user:
         flash("Faca login para concluir e acompanhar seu pedido.", "warning")
         return redirect(url_for("user.login_page", next=url_for("store.checkout_page")))
@@ -376,39 +417,7 @@ def checkout_finalize():
     contact_phone = (request.form.get("contact_phone") or "").strip() or None
     contact_email = (request.form.get("contact_email") or "").strip() or None
 
-    product_ids = [line["product"].id for line in cart_lines]
-    mappings = OccurrenceMapping.query.filter(OccurrenceMapping.product_id.in_(product_ids)).all()
-    mappings_by_product_id = {mapping.product_id: mapping for mapping in mappings}
-
-    categories = []
-    highest_urgency = "Baixa"
-
-    items_snapshot = []
-    for line in cart_lines:
-        product = line["product"]
-        mapping = mappings_by_product_id.get(product.id)
-        if mapping:
-            categories.append(mapping.occurrence_category)
-            mapping_urgency = (
-                mapping.urgency_level if mapping.urgency_level in URGENCY_SCORE else "Baixa"
-            )
-            if URGENCY_SCORE[mapping_urgency] > URGENCY_SCORE[highest_urgency]:
-                highest_urgency = mapping_urgency
-        else:
-            categories.append("Ocorrencia geral")
-
-        items_snapshot.append(
-            {
-                "product_id": product.id,
-                "product_name": product.name,
-                "category_slug": product.category_slug,
-                "quantity": line["quantity"],
-                "unit_price_cents": product.price_cents,
-                "line_total_cents": line["line_total_cents"],
-            }
-        )
-
-    mapped_category = ", ".join(list(dict.fromkeys(categories))) or "Ocorrencia geral"
+    mapped_category, highest_urgency, items_snapshot = _classify_cart_lines(cart_lines)
     discount_cents = subtotal_cents
     total_cents = 0
 
@@ -436,6 +445,8 @@ def checkout_finalize():
             changed_by_admin_id=None,
         )
     )
+    if highest_urgency == "Crítica":
+        task_runner.after_commit(CRITICAL_ALERT_TASK, occurrence.id)
     db.session.commit()
 
     _save_cart({})
@@ -446,7 +457,7 @@ def checkout_finalize():
 @store_bp.route("/checkout/sucesso/<int:occurrence_id>")
 def checkout_success_page(occurrence_id):
     occurrence = Occurrence.query.get_or_404(occurrence_id)
-    user = _current_user()
+    user = current_user()
     if not user or occurrence.user_id != user.id:
         flash("Acesso permitido apenas ao titular do pedido.", "error")
         return redirect(url_for("user.login_page", next=url_for("user.orders_page")))
@@ -7,22 +7,16 @@ from flask import (
     redirect,
     render_template,
     request,
-    session,
     url_for,
 )
 
+from app.identity import current_user, login_user, logout_user
 from app.models import Occurrence, OccurrenceUserMessage, User, db
+from app.nplusone import query_budget
+from app.ratelimit import rate_limiter
 
 
 user_bp = Blueprint("user", __name__)
-USER_SESSION_KEY = "user_id"
-
-
-def current_user():
-    user_id = session.get(USER_SESSION_KEY)
-    if not user_id:
-        return None
-    return db.session.get(User, user_id)
 
 
 def user_required(view_func):
@@ -38,6 +32,7 @@ def user_required(view_func):
 
 
 @user_bp.route("/cadastro", methods=["GET", "POST"])
+@rate_limiter.limit("register")
 def register_page():
     if current_user():
         return redirect(url_for("user.orders_page"))
@@ -77,8 +72,7 @@ def register_page():
         db.session.add(user)
         db.session.commit()
 
-        session[USER_SESSION_KEY] = user.id
-        session.modified = True
+        login_user(user)
         flash("Cadastro realizado com sucesso.", "success")
         return redirect(url_for("user.orders_page"))
 
@@ -86,6 +80,7 @@ def register_page():
 
 
 @user_bp.route("/login", methods=["GET", "POST"])
+@rate_limiter.limit("user_login", account=lambda: request.form.get("login"))
 def login_page():
     if current_user():
         return redirect(url_for("user.orders_page"))
@@ -102,8 +97,9 @@ def login_page():
             flash("Usuario/email ou senha invalidos.", "error")
             return render_template("store/login.html", active_nav="login")
 
-        session[USER_SESSION_KEY] = user.id
-        session.modified = True
+        if db.session.is_modified(user):
+            db.session.commit()
+        login_user(user)
         flash("Login realizado com sucesso.", "success")
         if next_path.startswith("/"):
             return redirect(next_path)
@@ -114,14 +110,14 @@ def login_page():
 
 @user_bp.route("/logout", methods=["POST"])
 def logout():
-    session.pop(USER_SESSION_KEY, None)
-    session.modified = True
+    logout_user()
     flash("Sessao do usuario encerrada.", "success")
     return redirect(url_for("store.home_page"))
 
 
 @user_bp.route("/meus-pedidos")
 @user_required
+@query_budget(3)
 def orders_page():
     orders = (
         Occurrence.query.filter_by(user_id=g.user.id)
@@ -137,6 +133,7 @@ def orders_page():
 
 @user_bp.route("/meus-pedidos/<int:occurrence_id>")
 @user_required
+@query_budget(5)
 def order_detail_page(occurrence_id):
     order = Occurrence.query.filter_by(id=occurrence_id, user_id=g.user.id).first_or_404()
     return render_template(
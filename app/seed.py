@@ -0,0 +1,31 @@
+from .catalog import import_catalog
+from .models import DEFAULT_PRODUCT_MAPPINGS, DEFAULT_PRODUCTS, AdminUser, User, db
+
+
+def _default_catalog_rows():
+    for product_data in DEFAULT_PRODUCTS:
+        occurrence_category, urgency_level = DEFAULT_PRODUCT_MAPPINGS.get(
+            product_data["slug"], ("Ocorrencia geral", "Baixa")
+        )
+        product = {"featured_order": None, "active": True, **product_data}
+        mapping = {"occurrence_category": occurrence_category, "urgency_level": urgency_level}
+        yield product, mapping
+
+
+def seed_database(app_config):
+    import_catalog(_default_catalog_rows(), update_existing=False)
+
+    if not AdminUser.query.first():
+        admin_user = AdminUser(username=app_config.get("ADMIN_DEFAULT_USERNAME", "admin"))
+        admin_user.set_password(app_config.get("ADMIN_DEFAULT_PASSWORD", "admin123"))
+        db.session.add(admin_user)
+
+    if not User.query.first():
+        demo_user = User(
+            username=app_config.get("USER_DEFAULT_USERNAME", "usuario_demo"),
+            email=app_config.get("USER_DEFAULT_EMAIL", "usuario@alomana.local"),
+        )
+        demo_user.set_password(app_config.get("USER_DEFAULT_PASSWORD", "usuario123"))
+        db.session.add(demo_user)
+
+    db.session.commit()
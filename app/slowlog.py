@@ -0,0 +1,311 @@
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import has_request_context, request
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from .jsonprovider import dumps_text
+from .models import SlowQuery, db
+
+
+SKIP_OPTION = "slow_query_log"
+REDACTED = "<oculto>"
+SENSITIVE_PARAM_PATTERN = re.compile(
+    r"password|senha|hash|token|secret|email|phone|telefone|observation|message|note|username",
+    re.IGNORECASE,
+)
+_PLACEHOLDER = r"(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)"
+_IN_LIST_PATTERN = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_STRING_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def fingerprint_statement(statement):
+    normalized = _STRING_LITERAL_PATTERN.sub("?", statement)
+    normalized = _NUMBER_LITERAL_PATTERN.sub("?", normalized)
+    # IN com N marcadores vira uma unica consulta no ranking.
+    normalized = _IN_LIST_PATTERN.sub("(?)", normalized)
+    normalized = _WHITESPACE_PATTERN.sub(" ", normalized).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _param_names(context, parameters):
+    if isinstance(parameters, dict):
+        return list(parameters)
+    compiled = getattr(context, "compiled", None)
+    names = getattr(compiled, "positiontup", None)
+    if names and len(names) == len(parameters):
+        return list(names)
+    return None
+
+
+def redact_parameters(context, parameters):
+    if not parameters:
+        return parameters
+    names = _param_names(context, parameters)
+    values = list(parameters.values()) if isinstance(parameters, dict) else list(parameters)
+    # O mesmo termo de busca costuma ir para varias colunas; se uma e sensivel, todas ficam.
+    sensitive_values = {
+        value
+        for index, value in enumerate(values)
+        if names and SENSITIVE_PARAM_PATTERN.search(names[index]) and isinstance(value, str)
+    }
+    redacted = []
+    for index, value in enumerate(values):
+        name = names[index] if names else None
+        if name is not None and SENSITIVE_PARAM_PATTERN.search(name):
+            value = REDACTED
+        elif isinstance(value, str) and value in sensitive_values:
+            value = REDACTED
+        elif name is None and isinstance(value, (str, bytes)):
+            # Sem nome do parametro nao da para saber o que e; textos ficam ocultos.
+            value = REDACTED
+        elif isinstance(value, bytes):
+            value = f"<{len(value)} bytes>"
+        elif not isinstance(value, (int, float, bool, type(None), str)):
+            value = str(value)
+        redacted.append(value)
+    if names:
+        return dict(zip(names, redacted))
+    return redacted
+
+
+def explain_plan(connection, statement, parameters):
+    dialect_name = connection.dialect.name
+    prefix = "EXPLAIN QUERY PLAN" if dialect_name == "sqlite" else "EXPLAIN"
+    rows = connection.exec_driver_sql(f"{prefix} {statement}", parameters).all()
+    return _format_plan(dialect_name, rows)
+
+
+def _format_plan(dialect_name, rows):
+    if dialect_name != "sqlite":
+        return "\n".join(str(row[0]) for row in rows)
+    depths = {0: -1}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depth = depths.get(parent_id, -1) + 1
+        depths[node_id] = depth
+        lines.append(f"{'  ' * depth}{detail}")
+    return "\n".join(lines)
+
+
+class SlowQueryLog:
+    def __init__(self):
+        self.enabled = False
+        self.threshold = 0.2
+        self.explain = True
+        self.retention_days = 7
+        self.max_rows = 5000
+        self.logger = None
+        self.dropped = 0
+        self._queue = None
+        self._queue_size = 1000
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+        self._binds = {}
+        self._store_engine = None
+        self._written = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get("SLOW_QUERY_LOG_ENABLED", True)
+        if not self.enabled:
+            return
+        self.threshold = float(app.config.get("SLOW_QUERY_THRESHOLD_MS", 200)) / 1000
+        self.explain = app.config.get("SLOW_QUERY_EXPLAIN", True)
+        self.retention_days = int(app.config.get("SLOW_QUERY_RETENTION_DAYS", 7))
+        self.max_rows = int(app.config.get("SLOW_QUERY_MAX_ROWS", 5000))
+        self._queue_size = int(app.config.get("SLOW_QUERY_QUEUE_SIZE", 1000))
+        self.logger = app.logger
+
+        with app.app_context():
+            self._store_engine = db.engine
+            for bind_key, engine in db.engines.items():
+                self._binds[engine] = bind_key or "primary"
+                if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+                    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        app.extensions["slow_query_log"] = self
+
+    def _get_queue(self):
+        pid = os.getpid()
+        with self._lock:
+            # Threads nao sobrevivem ao fork; cada worker do gunicorn cria a sua.
+            if self._worker is None or self._worker_pid != pid:
+                self._queue = queue.Queue(maxsize=self._queue_size)
+                self._worker = threading.Thread(
+                    target=self._run, args=(self._queue,), name="slow-query-log", daemon=True
+                )
+                self._worker.start()
+                self._worker_pid = pid
+            return self._queue
+
+    def record(self, conn, statement, parameters, context, executemany, elapsed):
+        if executemany:
+            raw_parameters = None
+            parameters = list(parameters[:1])
+        else:
+            raw_parameters = parameters
+        entry = {
+            "created_at": datetime.utcnow(),
+            "fingerprint": fingerprint_statement(statement),
+            "statement": statement,
+            "parameters": dumps_text(
+                [redact_parameters(context, item) for item in parameters]
+                if executemany
+                else redact_parameters(context, parameters)
+            ),
+            "duration_ms": round(elapsed * 1000, 3),
+            "bind": self._binds.get(conn.engine, "primary"),
+            "endpoint": None,
+            "method": None,
+            "path": None,
+        }
+        if has_request_context():
+            entry["endpoint"] = request.endpoint
+            entry["method"] = request.method
+            entry["path"] = request.path[:255]
+        try:
+            # Os parametros reais so vivem em memoria, para o EXPLAIN.
+            self._get_queue().put_nowait((conn.engine, entry, raw_parameters))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self, work_queue):
+        while True:
+            engine, entry, raw_parameters = work_queue.get()
+            try:
+                self._store(engine, entry, raw_parameters)
+            except Exception:
+                if self.logger is not None:
+                    self.logger.exception("Falha ao registrar consulta lenta.")
+            finally:
+                work_queue.task_done()
+
+    def _store(self, engine, entry, raw_parameters):
+        entry["plan"] = None
+        if self.explain and raw_parameters is not None and _is_select(entry["statement"]):
+            entry["plan"] = self._explain(engine, entry["statement"], raw_parameters)
+
+        with self._store_engine.connect() as connection:
+            connection = connection.execution_options(**{SKIP_OPTION: False})
+            with connection.begin():
+                connection.execute(SlowQuery.__table__.insert().values(**entry))
+                self._written += 1
+                if self._written % 100 == 1:
+                    self._prune(connection)
+
+        if self.logger is not None:
+            self.logger.info(
+                "Consulta lenta (%.1f ms) em %s: %s",
+                entry["duration_ms"],
+                entry["endpoint"] or "-",
+                _WHITESPACE_PATTERN.sub(" ", entry["statement"])[:200],
+            )
+
+    def _explain(self, engine, statement, parameters):
+        try:
+            with engine.connect() as connection:
+                connection = connection.execution_options(**{SKIP_OPTION: False})
+                return explain_plan(connection, statement, parameters)
+        except SQLAlchemyError as exc:
+            return f"EXPLAIN indisponivel: {exc.__class__.__name__}"
+
+    def _prune(self, connection):
+        table = SlowQuery.__table__
+        if self.retention_days:
+            cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+            connection.execute(delete(table).where(table.c.created_at < cutoff))
+        if self.max_rows:
+            newest_kept = connection.execute(
+                select(table.c.id).order_by(table.c.id.desc()).offset(self.max_rows).limit(1)
+            ).scalar()
+            if newest_kept is not None:
+                connection.execute(delete(table).where(table.c.id <= newest_kept))
+
+    def flush(self, timeout=5.0):
+        work_queue = self._queue
+        if work_queue is None or self._worker_pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while work_queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+def _is_select(statement):
+    return statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slowlog_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("slowlog_started_at")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if elapsed < slow_query_log.threshold:
+        return
+    if context is not None and not context.execution_options.get(SKIP_OPTION, True):
+        return
+    slow_query_log.record(conn, statement, parameters, context, executemany, elapsed)
+
+
+def top_offenders(limit=25, days=None):
+    table = SlowQuery.__table__
+    total = func.sum(table.c.duration_ms).label("total_ms")
+    query = (
+        select(
+            table.c.fingerprint,
+            func.count().label("calls"),
+            total,
+            func.avg(table.c.duration_ms).label("avg_ms"),
+            func.max(table.c.duration_ms).label("max_ms"),
+            func.max(table.c.id).label("latest_id"),
+            func.max(table.c.created_at).label("last_seen"),
+        )
+        .group_by(table.c.fingerprint)
+        .order_by(total.desc())
+        .limit(limit)
+    )
+    if days:
+        query = query.where(table.c.created_at >= datetime.utcnow() - timedelta(days=days))
+    # O ranking le a propria tabela; nao entra no log.
+    query = query.execution_options(**{SKIP_OPTION: False}, replica=False)
+    offenders = [row._asdict() for row in db.session.execute(query)]
+    if not offenders:
+        return []
+
+    samples = {
+        sample.id: sample
+        for sample in db.session.scalars(
+            select(SlowQuery)
+            .where(SlowQuery.id.in_([row["latest_id"] for row in offenders]))
+            .execution_options(**{SKIP_OPTION: False}, replica=False)
+        )
+    }
+    endpoints = {}
+    endpoint_rows = db.session.execute(
+        select(table.c.fingerprint, table.c.endpoint, func.count())
+        .where(table.c.fingerprint.in_([row["fingerprint"] for row in offenders]))
+        .group_by(table.c.fingerprint, table.c.endpoint)
+        .execution_options(**{SKIP_OPTION: False}, replica=False)
+    )
+    for fingerprint, endpoint, calls in endpoint_rows:
+        endpoints.setdefault(fingerprint, []).append((endpoint or "-", calls))
+
+    for row in offenders:
+        row["sample"] = samples.get(row["latest_id"])
+        row["endpoints"] = sorted(endpoints.get(row["fingerprint"], []), key=lambda item: -item[1])
+    return offenders
+
+
+slow_query_log = SlowQueryLog()
@@ -28,3 +28,107 @@
         });
     }
 })();
+
+(function () {
+    var body = document.body;
+    var sessionUrl = body.getAttribute("data-session-url");
+    if (!sessionUrl || !window.fetch) {
+        return;
+    }
+
+    function link(href, text, extraClass) {
+        var anchor = document.createElement("a");
+        anchor.className = "header-inline-link" + (extraClass ? " " + extraClass : "");
+        anchor.href = href;
+        anchor.textContent = text;
+        return anchor;
+    }
+
+    function renderAuthLinks(session) {
+        var container = document.querySelector(".header-auth-links");
+        if (!container) {
+            return;
+        }
+        while (container.firstChild) {
+            container.removeChild(container.firstChild);
+        }
+
+        if (session.user) {
+            var badge = document.createElement("span");
+            badge.className = "header-user-badge";
+            badge.textContent = session.user.username;
+            container.appendChild(badge);
+            container.appendChild(link(session.urls.orders, "Meus pedidos"));
+
+            var form = document.createElement("form");
+            form.action = session.urls.logout;
+            form.method = "post";
+            var button = document.createElement("button");
+            button.className = "header-inline-button";
+            button.type = "submit";
+            button.textContent = "Sair";
+            form.appendChild(button);
+            container.appendChild(form);
+        } else {
+            container.appendChild(link(session.urls.login, "Login usuaria"));
+            container.appendChild(link(session.urls.register, "Cadastro"));
+        }
+
+        container.appendChild(
+            link(session.urls.admin, session.admin ? "Painel admin" : "Login admin", "admin-link")
+        );
+    }
+
+    function renderCartBadge(count) {
+        var cartLink = document.querySelector(".cart-link");
+        if (!cartLink) {
+            return;
+        }
+        var badge = cartLink.querySelector(".cart-badge");
+        if (count > 0) {
+            if (!badge) {
+                badge = document.createElement("span");
+                badge.className = "cart-badge";
+                cartLink.appendChild(badge);
+            }
+            badge.textContent = count;
+        } else if (badge) {
+            cartLink.removeChild(badge);
+        }
+    }
+
+    function renderMessages(messages) {
+        var main = document.querySelector("main");
+        if (!messages.length || !main) {
+            return;
+        }
+        var section = document.createElement("section");
+        section.className = "flash-container";
+        messages.forEach(function (entry) {
+            var message = document.createElement("div");
+            message.className = "flash-message flash-" + entry[0];
+            message.textContent = entry[1];
+            section.appendChild(message);
+        });
+        main.parentNode.insertBefore(section, main);
+    }
+
+    fetch(sessionUrl, { credentials: "same-origin", headers: { Accept: "application/json" } })
+        .then(function (response) {
+            return response.ok ? response.json() : null;
+        })
+        .then(function (session) {
+            if (!session) {
+                return;
+            }
+            renderAuthLinks(session);
+            renderCartBadge(session.cart_items_count);
+            renderMessages(session.messages);
+
+            var footerAdminLink = document.querySelector(".footer-admin-link a");
+            if (footerAdminLink) {
+                footerAdminLink.href = session.urls.admin;
+            }
+        })
+        .catch(function () {});
+})();
@@ -0,0 +1,392 @@
+import random
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from .invalidation import CATALOG_NAMESPACE, MAPPINGS_NAMESPACE, bump_namespace_version
+from .jsonprovider import dumps_text
+from .models import (
+    DEFAULT_PRODUCT_MAPPINGS,
+    DEFAULT_PRODUCTS,
+    URGENCY_SCORE,
+    VALID_OCCURRENCE_STATUSES,
+    AdminUser,
+    Occurrence,
+    OccurrenceMapping,
+    OccurrenceNote,
+    OccurrenceStatusHistory,
+    OccurrenceUserMessage,
+    Product,
+    User,
+    db,
+)
+from .passwords import password_hasher
+from .rollups import apply_status_changes
+
+
+PRODUCT_VARIANTS = ("Mini", "Refil", "Edicao Limitada", "Duo", "Travel", "Intense", "Soft", "Pro")
+PRODUCT_SHADES = ("Rosa", "Nude", "Cafe", "Coral", "Areia", "Ambar", "Cereja", "Perola")
+NOTE_TEXTS = (
+    "Contato realizado pelo canal informado.",
+    "Caso encaminhado para a rede de apoio local.",
+    "Aguardando retorno da usuaria.",
+    "Orientacoes de seguranca enviadas.",
+    "Acompanhamento agendado.",
+)
+MESSAGE_TEXTS = (
+    "Consigo falar melhor a noite.",
+    "Prefiro contato por mensagem.",
+    "A situacao continua igual.",
+    "Obrigada pelo retorno.",
+    "Preciso de ajuda com urgencia.",
+)
+OBSERVATIONS = (
+    None,
+    None,
+    "Entregar em horario comercial.",
+    "Ligar antes de enviar.",
+    "Presente para uma amiga.",
+)
+# Limite de parametros por comando em SQLite antigo e de folga no Postgres.
+MAX_BIND_PARAMETERS = 30000
+
+
+class SyntheticDataError(ValueError):
+    pass
+
+
+def _rng(seed, name):
+    return random.Random(f"{seed}:{name}")
+
+
+def _next_id(connection, model):
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert_rows(connection, table, rows):
+    if not rows:
+        return
+    # executemany: o driver agrupa em VALUES multi-linha no Postgres e reaproveita
+    # o statement preparado no SQLite.
+    chunk_size = max(1, MAX_BIND_PARAMETERS // len(table.columns))
+    for start in range(0, len(rows), chunk_size):
+        connection.execute(insert(table), rows[start : start + chunk_size])
+
+
+def _reset_sequences(connection, models):
+    if connection.dialect.name != "postgresql":
+        return
+    for model in models:
+        table_name = model.__tablename__
+        connection.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table_name}), 1))"
+            )
+        )
+
+
+def _batches(total, batch_size):
+    start = 0
+    while start < total:
+        count = min(batch_size, total - start)
+        yield start, count
+        start += count
+
+
+def _generate_admins(engine, count, password_hash, created_at, progress):
+    with engine.begin() as connection:
+        first_id = _next_id(connection, AdminUser)
+        _insert_rows(
+            connection,
+            AdminUser.__table__,
+            [
+                {
+                    "id": first_id + index,
+                    "username": f"admin_sintetico_{first_id + index:04d}",
+                    "password_hash": password_hash,
+                    "created_at": created_at,
+                }
+                for index in range(count)
+            ],
+        )
+        _reset_sequences(connection, (AdminUser,))
+    if progress and count:
+        progress("admin_users", count, count)
+
+
+def _generate_products(engine, count, seed, batch_size, progress):
+    rng = _rng(seed, "products")
+    with engine.connect() as connection:
+        first_id = _next_id(connection, Product)
+
+    for start, batch_count in _batches(count, batch_size):
+        products = []
+        mappings = []
+        for offset in range(batch_count):
+            product_id = first_id + start + offset
+            template = DEFAULT_PRODUCTS[rng.randrange(len(DEFAULT_PRODUCTS))]
+            variant = f"{rng.choice(PRODUCT_VARIANTS)} {rng.choice(PRODUCT_SHADES)}"
+            products.append(
+                {
+                    "id": product_id,
+                    "slug": f"{template['slug']}-{product_id:07d}",
+                    "name": f"{template['name']} {variant}",
+                    "category_slug": template["category_slug"],
+                    "category_label": template["category_label"],
+                    "price_cents": max(990, template["price_cents"] + rng.randint(-20, 60) * 100),
+                    "description_short": template["description_short"],
+                    "description_long": template["description_long"],
+                    "image_filename": template["image_filename"],
+                    "featured_order": rng.randint(1, 500) if rng.random() < 0.2 else None,
+                    "active": rng.random() < 0.95,
+                }
+            )
+            if rng.random() < 0.6:
+                occurrence_category, urgency_level = DEFAULT_PRODUCT_MAPPINGS.get(
+                    template["slug"], ("Ocorrencia geral", "Baixa")
+                )
+                mappings.append(
+                    {
+                        "product_id": product_id,
+                        "occurrence_category": occurrence_category,
+                        "urgency_level": urgency_level,
+                    }
+                )
+        with engine.begin() as connection:
+            _insert_rows(connection, Product.__table__, products)
+            _insert_rows(connection, OccurrenceMapping.__table__, mappings)
+        if progress:
+            progress("products", start + batch_count, count)
+
+    if count:
+        with engine.begin() as connection:
+            _reset_sequences(connection, (Product, OccurrenceMapping))
+            bump_namespace_version(connection, CATALOG_NAMESPACE)
+            bump_namespace_version(connection, MAPPINGS_NAMESPACE)
+
+
+def _generate_users(engine, count, password_hash, batch_size, started_at, days, progress):
+    with engine.connect() as connection:
+        first_id = _next_id(connection, User)
+
+    for start, batch_count in _batches(count, batch_size):
+        rows = []
+        for offset in range(batch_count):
+            user_id = first_id + start + offset
+            rows.append(
+                {
+                    "id": user_id,
+                    "username": f"usuaria{user_id:08d}",
+                    "email": f"usuaria{user_id:08d}@exemplo.local",
+                    "password_hash": password_hash,
+                    "created_at": started_at
+                    + timedelta(days=days * (start + offset) / max(count, 1)),
+                }
+            )
+        with engine.begin() as connection:
+            _insert_rows(connection, User.__table__, rows)
+        if progress:
+            progress("users", start + batch_count, count)
+
+    if count:
+        with engine.begin() as connection:
+            _reset_sequences(connection, (User,))
+
+
+def _load_catalog(connection):
+    products = connection.execute(
+        select(Product.id, Product.name, Product.category_slug, Product.price_cents).where(
+            Product.active.is_(True)
+        ).order_by(Product.id)
+    ).all()
+    mappings = {
+        product_id: (category, urgency)
+        for product_id, category, urgency in connection.execute(
+            select(
+                OccurrenceMapping.product_id,
+                OccurrenceMapping.occurrence_category,
+                OccurrenceMapping.urgency_level,
+            )
+        )
+    }
+    return products, mappings
+
+
+def _status_trail(rng, created_at, age, ended_at, admin_ids):
+    statuses = VALID_OCCURRENCE_STATUSES
+    trail = [(None, statuses[0], None, created_at)]
+    # Ocorrencias antigas tendem a estar mais avancadas na triagem.
+    advance_probability = 0.35 + 0.6 * age
+    changed_at = created_at
+    step = 0
+    while step < len(statuses) - 1 and rng.random() < advance_probability:
+        changed_at = min(ended_at, changed_at + timedelta(minutes=rng.randint(10, 2880)))
+        trail.append((statuses[step], statuses[step + 1], rng.choice(admin_ids), changed_at))
+        step += 1
+    return trail
+
+
+def _occurrence_rows(rng, occurrence_id, created_at, age, context):
+    products, mappings, user_ids, admin_ids, ended_at = context
+    items = []
+    categories = []
+    highest_urgency = "Baixa"
+    subtotal_cents = 0
+    for product_id, name, category_slug, price_cents in rng.sample(
+        products, min(len(products), rng.randint(1, 4))
+    ):
+        quantity = rng.randint(1, 3)
+        subtotal_cents += price_cents * quantity
+        items.append(
+            {
+                "product_id": product_id,
+                "product_name": name,
+                "category_slug": category_slug,
+                "quantity": quantity,
+                "unit_price_cents": price_cents,
+                "line_total_cents": price_cents * quantity,
+            }
+        )
+        category, urgency = mappings.get(product_id, ("Ocorrencia geral", "Baixa"))
+        categories.append(category)
+        if URGENCY_SCORE.get(urgency, 0) > URGENCY_SCORE[highest_urgency]:
+            highest_urgency = urgency
+
+    user_id = rng.choice(user_ids)
+    trail = _status_trail(rng, created_at, age, ended_at, admin_ids)
+    occurrence = {
+        "id": occurrence_id,
+        "created_at": created_at,
+        "updated_at": trail[-1][3],
+        "status": trail[-1][1],
+        "mapped_category": ", ".join(dict.fromkeys(categories)),
+        "urgency_level": highest_urgency,
+        "user_id": user_id,
+        "contact_phone": f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"
+        if rng.random() < 0.4
+        else None,
+        "contact_email": f"contato{user_id}@exemplo.local" if rng.random() < 0.3 else None,
+        "observation": rng.choice(OBSERVATIONS),
+        "items_json": dumps_text(items),
+        "subtotal_cents": subtotal_cents,
+        "discount_cents": subtotal_cents,
+        "total_cents": 0,
+    }
+    histories = [
+        {
+            "occurrence_id": occurrence_id,
+            "previous_status": previous_status,
+            "new_status": new_status,
+            "changed_by_admin_id": admin_id,
+            "changed_at": changed_at,
+        }
+        for previous_status, new_status, admin_id, changed_at in trail
+    ]
+    notes = []
+    if len(trail) > 1:
+        for _ in range(rng.choice((0, 0, 1, 1, 2))):
+            notes.append(
+                {
+                    "occurrence_id": occurrence_id,
+                    "admin_user_id": rng.choice(admin_ids),
+                    "created_at": min(ended_at, created_at + timedelta(hours=rng.randint(1, 96))),
+                    "note_text": rng.choice(NOTE_TEXTS),
+                }
+            )
+    messages = [
+        {
+            "occurrence_id": occurrence_id,
+            "user_id": user_id,
+            "created_at": min(ended_at, created_at + timedelta(hours=rng.randint(1, 120))),
+            "message_text": rng.choice(MESSAGE_TEXTS),
+        }
+        for _ in range(rng.choice((0, 0, 0, 1, 2)))
+    ]
+    return occurrence, histories, notes, messages
+
+
+def _generate_occurrences(engine, count, seed, batch_size, started_at, ended_at, progress):
+    with engine.connect() as connection:
+        first_id = _next_id(connection, Occurrence)
+        products, mappings = _load_catalog(connection)
+        user_ids = connection.execute(select(User.id).order_by(User.id)).scalars().all()
+        admin_ids = connection.execute(select(AdminUser.id).order_by(AdminUser.id)).scalars().all()
+    if count and not (products and user_ids and admin_ids):
+        raise SyntheticDataError(
+            "Gerar ocorrencias exige produtos ativos, usuarias e ao menos um admin."
+        )
+
+    rng = _rng(seed, "occurrences")
+    span_seconds = (ended_at - started_at).total_seconds()
+    context = (products, mappings, user_ids, admin_ids, ended_at)
+    for start, batch_count in _batches(count, batch_size):
+        occurrences, histories, notes, messages, status_changes = [], [], [], [], []
+        for offset in range(batch_count):
+            index = start + offset
+            # Ids crescem junto com created_at, como em producao.
+            position = (index + rng.random()) / count
+            created_at = started_at + timedelta(seconds=span_seconds * position)
+            occurrence, history_rows, note_rows, message_rows = _occurrence_rows(
+                rng, first_id + index, created_at, 1 - position, context
+            )
+            occurrences.append(occurrence)
+            histories.extend(history_rows)
+            status_changes.extend(
+                (
+                    row["changed_at"],
+                    occurrence["mapped_category"],
+                    occurrence["urgency_level"],
+                    row["previous_status"],
+                    row["new_status"],
+                )
+                for row in history_rows
+            )
+            notes.extend(note_rows)
+            messages.extend(message_rows)
+
+        with engine.begin() as connection:
+            _insert_rows(connection, Occurrence.__table__, occurrences)
+            _insert_rows(connection, OccurrenceStatusHistory.__table__, histories)
+            _insert_rows(connection, OccurrenceNote.__table__, notes)
+            _insert_rows(connection, OccurrenceUserMessage.__table__, messages)
+            # Insercao via Core nao passa pelo flush da sessao; o rollup vai no mesmo lote.
+            apply_status_changes(connection, status_changes)
+        if progress:
+            progress("occurrences", start + batch_count, count)
+
+    if count:
+        with engine.begin() as connection:
+            _reset_sequences(
+                connection,
+                (Occurrence, OccurrenceStatusHistory, OccurrenceNote, OccurrenceUserMessage),
+            )
+
+
+def generate_dataset(
+    products=0,
+    users=0,
+    occurrences=0,
+    admins=0,
+    seed=1,
+    batch_size=5000,
+    days=365,
+    end_date=None,
+    password="usuario123",
+    analyze=True,
+    progress=None,
+):
+    engine = db.engine
+    ended_at = datetime.combine(end_date or datetime.utcnow().date(), time.min)
+    started_at = ended_at - timedelta(days=days)
+    # Um unico hash para todas as contas: o custo do scrypt inviabilizaria milhoes de linhas.
+    password_hash = password_hasher.hash(password) if users or admins else None
+
+    _generate_admins(engine, admins, password_hash, started_at, progress)
+    _generate_products(engine, products, seed, batch_size, progress)
+    _generate_users(engine, users, password_hash, batch_size, started_at, days, progress)
+    _generate_occurrences(engine, occurrences, seed, batch_size, started_at, ended_at, progress)
+
+    if analyze:
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
@@ -0,0 +1,398 @@
+import atexit
+import heapq
+import itertools
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter, namedtuple
+
+from sqlalchemy import event
+
+from .jsonprovider import dumps_text, loads
+from .replica import RoutingSession
+
+
+PENDING_TASKS_INFO_KEY = "pending_tasks"
+
+Job = namedtuple("Job", "name args kwargs attempts enqueued_at durable_id")
+
+
+class TaskError(Exception):
+    pass
+
+
+class DurableQueue:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def setup(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS task_queue ("
+            " id INTEGER PRIMARY KEY,"
+            " name TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " enqueued_at REAL NOT NULL,"
+            " available_at REAL NOT NULL,"
+            " locked_by TEXT,"
+            " locked_at REAL,"
+            " last_error TEXT)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_task_queue_status_available_at"
+            " ON task_queue (status, available_at)"
+        )
+
+    def push(self, name, payload):
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO task_queue (name, payload, enqueued_at, available_at) VALUES (?, ?, ?, ?)",
+            (name, payload, now, now),
+        )
+        return cursor.lastrowid
+
+    def claim(self, worker_id, lease_seconds):
+        connection = self._connection()
+        now = time.time()
+        # IMMEDIATE: dois workers do gunicorn nunca pegam a mesma tarefa.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "UPDATE task_queue SET status = 'pending', locked_by = NULL, locked_at = NULL"
+                " WHERE status = 'running' AND locked_at < ?",
+                (now - lease_seconds,),
+            )
+            row = connection.execute(
+                "UPDATE task_queue SET status = 'running', locked_by = ?, locked_at = ?"
+                " WHERE id = (SELECT id FROM task_queue WHERE status = 'pending'"
+                " AND available_at <= ? ORDER BY available_at, id LIMIT 1)"
+                " RETURNING id, name, payload, attempts, enqueued_at",
+                (worker_id, now, now),
+            ).fetchone()
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return row
+
+    def complete(self, task_id):
+        self._connection().execute("DELETE FROM task_queue WHERE id = ?", (task_id,))
+
+    def retry(self, task_id, delay, error):
+        self._connection().execute(
+            "UPDATE task_queue SET status = 'pending', attempts = attempts + 1,"
+            " available_at = ?, locked_by = NULL, locked_at = NULL, last_error = ? WHERE id = ?",
+            (time.time() + delay, error, task_id),
+        )
+
+    def fail(self, task_id, error):
+        self._connection().execute(
+            "UPDATE task_queue SET status = 'failed', attempts = attempts + 1,"
+            " locked_by = NULL, locked_at = NULL, last_error = ? WHERE id = ?",
+            (error, task_id),
+        )
+
+    def requeue_failed(self):
+        cursor = self._connection().execute(
+            "UPDATE task_queue SET status = 'pending', attempts = 0, available_at = ?"
+            " WHERE status = 'failed'",
+            (time.time(),),
+        )
+        return cursor.rowcount
+
+    def failed(self, limit=20):
+        return self._connection().execute(
+            "SELECT id, name, attempts, enqueued_at, last_error FROM task_queue"
+            " WHERE status = 'failed' ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+    def stats(self):
+        connection = self._connection()
+        depth = dict(
+            connection.execute("SELECT status, COUNT(*) FROM task_queue GROUP BY status").fetchall()
+        )
+        oldest_due = connection.execute(
+            "SELECT MIN(available_at) FROM task_queue WHERE status = 'pending' AND available_at <= ?",
+            (time.time(),),
+        ).fetchone()[0]
+        return {
+            "depth": {status: depth.get(status, 0) for status in ("pending", "running", "failed")},
+            "lag_seconds": max(0.0, time.time() - oldest_due) if oldest_due else 0.0,
+        }
+
+
+class TaskRunner:
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self.workers = 2
+        self.queue_size = 1000
+        self.max_retries = 5
+        self.retry_backoff = 1.0
+        self.retry_backoff_max = 300.0
+        self.poll_interval = 1.0
+        self.lease_seconds = 300
+        self.shutdown_timeout = 5.0
+        self.durable = None
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._delayed = []
+        self._sequence = itertools.count()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._counts = Counter()
+        self._seconds = Counter()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Um lock herdado no meio do uso travaria o worker para sempre.
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def task(self, name, durable=False, max_retries=None):
+        def register(func):
+            self._tasks[name] = (func, {"durable": durable, "max_retries": max_retries})
+            return func
+
+        return register
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get("TASKS_ENABLED", True)
+        self.workers = max(1, int(app.config.get("TASKS_WORKERS", self.workers)))
+        self.queue_size = int(app.config.get("TASKS_QUEUE_SIZE", self.queue_size))
+        self.max_retries = int(app.config.get("TASKS_MAX_RETRIES", self.max_retries))
+        self.retry_backoff = float(app.config.get("TASKS_RETRY_BACKOFF_SECONDS", self.retry_backoff))
+        self.retry_backoff_max = float(
+            app.config.get("TASKS_RETRY_BACKOFF_MAX_SECONDS", self.retry_backoff_max)
+        )
+        self.poll_interval = float(app.config.get("TASKS_POLL_INTERVAL", self.poll_interval))
+        self.lease_seconds = int(app.config.get("TASKS_LEASE_SECONDS", self.lease_seconds))
+        self.shutdown_timeout = float(app.config.get("TASKS_SHUTDOWN_TIMEOUT", self.shutdown_timeout))
+        self.durable = None
+        if self.enabled and app.config.get("TASKS_DURABLE_PATH"):
+            self.durable = DurableQueue(app.config["TASKS_DURABLE_PATH"])
+            self.durable.setup()
+        if self.enabled:
+            # Workers do gunicorn sobem as threads na primeira requisicao.
+            app.before_request(self._ensure_started)
+        app.extensions["task_runner"] = self
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Threads nao sobrevivem ao fork; cada processo cria as suas.
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._delayed = []
+            self._stopping = threading.Event()
+            self._wakeup = threading.Event()
+            for index in range(self.workers):
+                threading.Thread(
+                    target=self._work, name=f"task-worker-{index}", daemon=True
+                ).start()
+            threading.Thread(target=self._dispatch, name="task-dispatcher", daemon=True).start()
+            self._pid = os.getpid()
+        atexit.register(self.shutdown)
+
+    def enqueue(self, name, *args, **kwargs):
+        if name not in self._tasks:
+            raise TaskError(f"Tarefa desconhecida: {name}")
+        func, options = self._tasks[name]
+        if not self.enabled:
+            with self.app.app_context():
+                return func(*args, **kwargs)
+
+        self._ensure_started()
+        if options["durable"] and self.durable is not None:
+            self.durable.push(name, dumps_text({"args": list(args), "kwargs": kwargs}))
+            self._wakeup.set()
+            return
+        job = Job(name, args, kwargs, 0, time.time(), None)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            # Fila cheia: executa no chamador em vez de perder a tarefa.
+            self._count(name, "inline")
+            self._execute(job)
+
+    def after_commit(self, name, *args, **kwargs):
+        from .models import db
+
+        if name not in self._tasks:
+            raise TaskError(f"Tarefa desconhecida: {name}")
+        db_session = db.session()
+        if not db_session.in_transaction():
+            # Sem transacao aberta um rollback nao emitiria evento e a tarefa vazaria para o proximo commit.
+            db_session.begin()
+        db_session.info.setdefault(PENDING_TASKS_INFO_KEY, []).append((name, args, kwargs))
+
+    def _work(self):
+        work_queue = self._queue
+        while not self._stopping.is_set():
+            try:
+                job = work_queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            try:
+                self._execute(job)
+            finally:
+                work_queue.task_done()
+                if job.durable_id is not None:
+                    self._wakeup.set()
+
+    def _dispatch(self):
+        worker_id = f"{os.uname().nodename}:{os.getpid()}"
+        while not self._stopping.is_set():
+            self._move_due_retries()
+            while self.durable is not None and self._queue.qsize() < self.workers:
+                try:
+                    row = self.durable.claim(worker_id, self.lease_seconds)
+                except sqlite3.Error:
+                    self.app.logger.exception("Falha ao ler a fila duravel de tarefas.")
+                    break
+                if row is None:
+                    break
+                task_id, name, payload, attempts, enqueued_at = row
+                data = loads(payload)
+                self._queue.put(
+                    Job(name, tuple(data["args"]), data["kwargs"], attempts, enqueued_at, task_id)
+                )
+            self._wakeup.wait(self._next_wait())
+            self._wakeup.clear()
+
+    def _move_due_retries(self):
+        now = time.time()
+        with self._lock:
+            while self._delayed and self._delayed[0][0] <= now and not self._queue.full():
+                self._queue.put_nowait(heapq.heappop(self._delayed)[2])
+
+    def _next_wait(self):
+        with self._lock:
+            if self._delayed:
+                return max(0.0, min(self.poll_interval, self._delayed[0][0] - time.time()))
+        return self.poll_interval
+
+    def _execute(self, job):
+        entry = self._tasks.get(job.name)
+        if entry is None:
+            self._give_up(job, f"Tarefa desconhecida: {job.name}")
+            return
+        func, options = entry
+        started = time.perf_counter()
+        try:
+            with self.app.app_context():
+                func(*job.args, **job.kwargs)
+        except Exception as exc:
+            self._count(job.name, "error", time.perf_counter() - started)
+            self._retry_or_give_up(job, options, exc)
+            return
+        self._count(job.name, "ok", time.perf_counter() - started)
+        if job.durable_id is not None:
+            self.durable.complete(job.durable_id)
+
+    def _retry_or_give_up(self, job, options, exc):
+        error = f"{exc.__class__.__name__}: {exc}"
+        max_retries = options["max_retries"]
+        if max_retries is None:
+            max_retries = self.max_retries
+        if job.attempts >= max_retries:
+            self.app.logger.error(
+                "Tarefa %s falhou apos %s tentativas: %s", job.name, job.attempts + 1, error
+            )
+            self._give_up(job, error)
+            return
+
+        delay = min(self.retry_backoff * 2 ** job.attempts, self.retry_backoff_max)
+        delay *= 0.5 + random.random() / 2
+        self._count(job.name, "retry")
+        self.app.logger.warning(
+            "Tarefa %s falhou (%s); nova tentativa em %.1fs.", job.name, error, delay
+        )
+        if job.durable_id is not None:
+            self.durable.retry(job.durable_id, delay, error)
+            return
+        with self._lock:
+            heapq.heappush(
+                self._delayed,
+                (time.time() + delay, next(self._sequence), job._replace(attempts=job.attempts + 1)),
+            )
+        self._wakeup.set()
+
+    def _give_up(self, job, error):
+        self._count(job.name, "failed")
+        if job.durable_id is not None:
+            self.durable.fail(job.durable_id, error)
+
+    def _count(self, name, outcome, seconds=0.0):
+        with self._lock:
+            self._counts[(name, outcome)] += 1
+            self._seconds[name] += seconds
+
+    def shutdown(self):
+        if self._pid != os.getpid():
+            return
+        # Espera as tarefas em memoria terminarem; as duraveis voltam para a fila pelo lease.
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self._stopping.set()
+        self._wakeup.set()
+        self._pid = None
+
+    def metrics(self):
+        depth = 0
+        lag = 0.0
+        if self._pid == os.getpid():
+            with self._queue.mutex:
+                depth = len(self._queue.queue)
+                oldest = self._queue.queue[0].enqueued_at if self._queue.queue else None
+            if oldest is not None:
+                lag = max(0.0, time.time() - oldest)
+            with self._lock:
+                depth += len(self._delayed)
+        return {
+            "queue_depth": depth,
+            "queue_lag_seconds": lag,
+            "durable": self.durable.stats() if self.durable is not None else None,
+            "counts": dict(self._counts),
+            "seconds": dict(self._seconds),
+        }
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _enqueue_pending_tasks(db_session):
+    for name, args, kwargs in db_session.info.pop(PENDING_TASKS_INFO_KEY, ()):
+        task_runner.enqueue(name, *args, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _discard_pending_tasks(db_session, previous_transaction):
+    if previous_transaction.parent is None:
+        db_session.info.pop(PENDING_TASKS_INFO_KEY, None)
+
+
+task_runner = TaskRunner()
@@ -0,0 +1,35 @@
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+
+def init_bytecode_cache(app):
+    cache_dir = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if not cache_dir:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as exc:
+        app.logger.warning("Cache de bytecode Jinja desativado (%s).", exc)
+        return
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+
+def warm_templates(app, reset=False):
+    if reset and app.jinja_env.cache is not None:
+        app.jinja_env.cache.clear()
+
+    timings = {}
+    started_at = time.perf_counter()
+    for template_name in sorted(app.jinja_env.list_templates(extensions=("html",))):
+        template_started_at = time.perf_counter()
+        app.jinja_env.get_template(template_name)
+        timings[template_name] = time.perf_counter() - template_started_at
+
+    app.logger.info(
+        "%s templates pre-compilados em %.1f ms.",
+        len(timings),
+        (time.perf_counter() - started_at) * 1000,
+    )
+    return timings
@@ -0,0 +1,472 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from .stats import compare_entries, load_report, report_metadata, summarize_durations, write_report
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_TERMS = ("", "batom", "base", "kit", "pincel", "paleta", "serum")
+ORDER_CODES = ("mais-vendidos", "menor-preco", "maior-preco")
+CATEGORY_SLUGS = ("kits", "skincare", "maquiagem")
+OCCURRENCE_STATUSES = ("Novo", "Em triagem", "Encaminhado", "Concluído")
+DEFAULT_MIX = "browse=70,buy=20,admin=10"
+SUCCESS_PATH = re.compile(r"/checkout/sucesso/(\d+)")
+RETRYABLE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class JourneyError(Exception):
+    pass
+
+
+class Recorder:
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, label, elapsed, error=False):
+        with self._lock:
+            self.durations[label].append(elapsed)
+            if error:
+                self.errors[label] += 1
+
+    def summary(self, elapsed):
+        with self._lock:
+            return {
+                label: {
+                    **summarize_durations(durations),
+                    "errors": self.errors.get(label, 0),
+                    "throughput_rps": round(len(durations) / elapsed, 3) if elapsed else 0.0,
+                }
+                for label, durations in self.durations.items()
+            }
+
+
+class Client:
+    def __init__(self, base_url, recorder, timeout=30):
+        parsed = urlsplit(base_url)
+        connection_class = (
+            http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        )
+        self.connection = connection_class(parsed.hostname, parsed.port, timeout=timeout)
+        self.prefix = parsed.path.rstrip("/")
+        self.recorder = recorder
+        self.cookies = {}
+        self.user_logged_in = False
+        self.admin_logged_in = False
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, path, label):
+        return self.request("GET", path, label)
+
+    def post(self, path, label, form):
+        return self.request("POST", path, label, form)
+
+    def request(self, method, path, label, form=None):
+        body = urlencode(form) if form is not None else None
+        headers = {"Accept-Encoding": "gzip"}
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in self.cookies.items())
+
+        started = time.perf_counter()
+        for attempt in (1, 2):
+            try:
+                self.connection.request(method, self.prefix + path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                break
+            except RETRYABLE_ERRORS:
+                # Conexao keep-alive fechada pelo servidor entre requisicoes.
+                self.connection.close()
+                if attempt == 2:
+                    self.recorder.record(label, time.perf_counter() - started, error=True)
+                    raise JourneyError(f"{method} {path}: conexao encerrada")
+            except (OSError, http.client.HTTPException) as exc:
+                self.connection.close()
+                self.recorder.record(label, time.perf_counter() - started, error=True)
+                raise JourneyError(f"{method} {path}: {exc}") from exc
+        elapsed = time.perf_counter() - started
+
+        self._store_cookies(response)
+        failed = response.status >= 400
+        self.recorder.record(label, elapsed, error=failed)
+        if failed:
+            raise JourneyError(f"{method} {path}: HTTP {response.status}")
+        return response.status, response.getheader("Location") or ""
+
+    def _store_cookies(self, response):
+        for header in response.headers.get_all("Set-Cookie") or ():
+            pair, _, attributes = header.partition(";")
+            name, _, value = pair.strip().partition("=")
+            attributes = attributes.lower()
+            if not value or "max-age=0" in attributes or "1970" in attributes:
+                self.cookies.pop(name, None)
+            else:
+                self.cookies[name] = value
+
+
+class LoadContext:
+    def __init__(self, products, options):
+        self.products = products
+        self.options = options
+        self.occurrence_ids = []
+        self._lock = threading.Lock()
+
+    def add_occurrence(self, occurrence_id):
+        with self._lock:
+            self.occurrence_ids.append(occurrence_id)
+
+    def pick_occurrence(self, rng):
+        with self._lock:
+            recent = self.occurrence_ids[-200:]
+        return rng.choice(recent) if recent else None
+
+
+def browse_journey(client, context, rng):
+    client.get("/", "GET /")
+    query = {"q": rng.choice(SEARCH_TERMS), "ordem": rng.choice(ORDER_CODES)}
+    client.get(f"/produtos?{urlencode(query)}", "GET /produtos?q&ordem")
+    client.get(f"/categoria/{rng.choice(CATEGORY_SLUGS)}", "GET /categoria/<slug>")
+    product = rng.choice(context.products)
+    client.get(f"/produto/{product['slug']}", "GET /produto/<slug>")
+
+
+def buy_journey(client, context, rng):
+    if not client.user_logged_in:
+        client.get("/login", "GET /login")
+        status, _ = client.post(
+            "/login",
+            "POST /login",
+            {"login": context.options.user_login, "password": context.options.user_password},
+        )
+        if status != 302:
+            raise JourneyError("login da usuaria recusado")
+        client.user_logged_in = True
+
+    for product in rng.sample(context.products, min(len(context.products), rng.randint(1, 3))):
+        client.post(
+            "/carrinho/item",
+            "POST /carrinho/item",
+            {"product_id": product["id"], "quantity": rng.randint(1, 2), "next": "/carrinho"},
+        )
+    client.get("/carrinho", "GET /carrinho")
+    client.get("/checkout", "GET /checkout")
+    _, location = client.post(
+        "/checkout/finalizar",
+        "POST /checkout/finalizar",
+        {"observation": "Teste de carga", "contact_email": "carga@alomana.local"},
+    )
+    match = SUCCESS_PATH.search(location)
+    if match:
+        context.add_occurrence(int(match.group(1)))
+        client.get(f"/checkout/sucesso/{match.group(1)}", "GET /checkout/sucesso/<id>")
+
+
+def admin_journey(client, context, rng):
+    if not client.admin_logged_in:
+        status, _ = client.post(
+            "/admin/login",
+            "POST /admin/login",
+            {"username": context.options.admin_username, "password": context.options.admin_password},
+        )
+        if status != 302:
+            raise JourneyError("login admin recusado")
+        client.admin_logged_in = True
+
+    status_filter = rng.choice(("",) + OCCURRENCE_STATUSES)
+    client.get(f"/admin/ocorrencias?{urlencode({'status': status_filter})}", "GET /admin/ocorrencias")
+    occurrence_id = context.pick_occurrence(rng)
+    if occurrence_id is None:
+        return
+    client.get(f"/admin/ocorrencias/{occurrence_id}", "GET /admin/ocorrencias/<id>")
+    client.post(
+        f"/admin/ocorrencias/{occurrence_id}/status",
+        "POST /admin/ocorrencias/<id>/status",
+        {"status": rng.choice(OCCURRENCE_STATUSES)},
+    )
+
+
+JOURNEYS = {"browse": browse_journey, "buy": buy_journey, "admin": admin_journey}
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in JOURNEYS:
+            raise argparse.ArgumentTypeError(f"Jornada desconhecida: {name}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("Informe ao menos uma jornada com peso positivo.")
+    return mix
+
+
+def run_virtual_user(index, base_url, context, recorder, journey_recorder, deadline, options):
+    rng = random.Random(options.seed * 1000 + index)
+    names = list(options.mix)
+    weights = [options.mix[name] for name in names]
+    client = Client(base_url, recorder, timeout=options.timeout)
+    try:
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                JOURNEYS[name](client, context, rng)
+            except JourneyError as exc:
+                journey_recorder.record(name, time.perf_counter() - started, error=True)
+                if options.verbose:
+                    print(f"[vu {index}] {name}: {exc}", file=sys.stderr)
+                # Recomeca a sessao para nao repetir o mesmo erro em cascata.
+                client.close()
+                client = Client(base_url, recorder, timeout=options.timeout)
+                continue
+            journey_recorder.record(name, time.perf_counter() - started)
+            if options.think_ms:
+                time.sleep(rng.uniform(0, 2 * options.think_ms) / 1000)
+    finally:
+        client.close()
+
+
+def run_phase(base_url, context, duration, options):
+    recorder = Recorder()
+    journey_recorder = Recorder()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=run_virtual_user,
+            args=(index, base_url, context, recorder, journey_recorder, deadline, options),
+            daemon=True,
+        )
+        for index in range(options.users)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, journey_recorder, time.perf_counter() - started
+
+
+def fetch_products(base_url, timeout):
+    parsed = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=timeout)
+    try:
+        connection.request("GET", parsed.path.rstrip("/") + "/api/produtos")
+        response = connection.getresponse()
+        payload = response.read()
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise SystemExit(f"Falha ao carregar /api/produtos: HTTP {response.status}")
+    products = json.loads(payload)
+    if not products:
+        raise SystemExit("Catalogo vazio; rode o seed antes do teste de carga.")
+    return products
+
+
+def wait_until_ready(base_url, process, timeout=60):
+    parsed = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Servidor encerrou com codigo {process.returncode}.")
+        try:
+            connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=2)
+            connection.request("GET", "/api/health")
+            if connection.getresponse().status == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        finally:
+            connection.close()
+        time.sleep(0.25)
+    raise SystemExit("Servidor nao respondeu a /api/health a tempo.")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(options):
+    port = options.port or _free_port()
+    database_url = options.database_url or "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix="alomana-load-"), "loadtest.db"
+    )
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "PORT": str(port),
+        "SCHEMA_AUTO_UPGRADE": "1",
+        # O limitador de tentativas bloquearia as sessoes sinteticas.
+        "RATE_LIMIT_ENABLED": "0",
+    }
+    if options.start == "gunicorn":
+        env["GUNICORN_BIND"] = f"127.0.0.1:{port}"
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"]
+    else:
+        command = [sys.executable, "run.py"]
+    output = None if options.verbose else subprocess.DEVNULL
+    process = subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=output, stderr=output)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url, process)
+    except BaseException:
+        stop_server(process)
+        raise
+    return process, base_url, database_url
+
+
+def stop_server(process):
+    if process.poll() is not None:
+        return
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def print_summary(report):
+    totals = report["totals"]
+    print(
+        f"{totals['requests']} requisicoes em {totals['elapsed_s']:.1f}s "
+        f"({totals['throughput_rps']:.1f} req/s), {totals['errors']} erros"
+    )
+    print(f"{'rota':<42} {'n':>6} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'erros':>6}")
+    for label, entry in sorted(report["routes"].items()):
+        print(
+            f"{label:<42} {entry['count']:>6} {entry['throughput_rps']:>8.1f} "
+            f"{entry['p50_ms']:>9.1f} {entry['p95_ms']:>9.1f} {entry['p99_ms']:>9.1f} "
+            f"{entry['errors']:>6}"
+        )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load",
+        description="Gera carga com jornadas reais da loja e do painel admin.",
+    )
+    parser.add_argument("--base-url", help="URL de um servidor ja em execucao.")
+    parser.add_argument(
+        "--start",
+        choices=("run", "gunicorn"),
+        help="Sobe o app localmente (run.py ou gunicorn) com banco semeado.",
+    )
+    parser.add_argument("--database-url", help="Banco usado com --start (padrao: SQLite temporario).")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--users", type=int, default=8, help="Usuarios virtuais simultaneos.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos de medicao.")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Segundos de aquecimento.")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--think-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument(
+        "--user-login", default=os.environ.get("USER_DEFAULT_USERNAME", "usuario_demo")
+    )
+    parser.add_argument(
+        "--user-password", default=os.environ.get("USER_DEFAULT_PASSWORD", "usuario123")
+    )
+    parser.add_argument(
+        "--admin-username", default=os.environ.get("ADMIN_DEFAULT_USERNAME", "admin")
+    )
+    parser.add_argument(
+        "--admin-password", default=os.environ.get("ADMIN_DEFAULT_PASSWORD", "admin123")
+    )
+    parser.add_argument("--output", help="Arquivo JSON do relatorio.")
+    parser.add_argument("--compare", help="Relatorio anterior para comparar.")
+    parser.add_argument("--metric", default="p95_ms", choices=("p50_ms", "p95_ms", "p99_ms"))
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Piora tolerada (0.2 = 20%%)."
+    )
+    parser.add_argument("--verbose", action="store_true")
+    return parser
+
+
+def main(argv=None):
+    options = build_parser().parse_args(argv)
+    if not options.base_url and not options.start:
+        raise SystemExit("Informe --base-url ou --start.")
+
+    process = None
+    base_url = (options.base_url or "").rstrip("/")
+    database_url = None
+    if options.start:
+        process, base_url, database_url = start_server(options)
+
+    try:
+        context = LoadContext(fetch_products(base_url, options.timeout), options)
+        if options.warmup > 0:
+            run_phase(base_url, context, options.warmup, options)
+        recorder, journey_recorder, elapsed = run_phase(
+            base_url, context, options.duration, options
+        )
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    routes = recorder.summary(elapsed)
+    total_requests = sum(entry["count"] for entry in routes.values())
+    report = {
+        "meta": report_metadata(
+            kind="load",
+            target=base_url,
+            server=options.start or "external",
+            database=database_url,
+            users=options.users,
+            duration_s=options.duration,
+            warmup_s=options.warmup,
+            mix=options.mix,
+            seed=options.seed,
+        ),
+        "totals": {
+            "requests": total_requests,
+            "errors": sum(entry["errors"] for entry in routes.values()),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total_requests / elapsed, 3) if elapsed else 0.0,
+        },
+        "routes": routes,
+        "journeys": journey_recorder.summary(elapsed),
+    }
+
+    print_summary(report)
+    if options.output:
+        write_report(report, options.output)
+        print(f"Relatorio salvo em {options.output}.")
+
+    if options.compare:
+        baseline = load_report(options.compare)
+        regressions, lines = compare_entries(
+            baseline.get("routes", {}), routes, options.metric, options.threshold
+        )
+        print(f"Comparacao de {options.metric} com {options.compare}:")
+        print("\n".join(lines))
+        if regressions:
+            print(f"{len(regressions)} rota(s) acima do limite de {options.threshold:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
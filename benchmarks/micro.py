@@ -0,0 +1,300 @@
+import argparse
+import gc
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+
+from .stats import compare_entries, load_report, report_metadata, summarize_durations, write_report
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "baselines", "micro.json")
+DEFAULT_SIZES = {"catalog": (100, 1000, 10000), "cart": (1, 10, 50), "history": (1, 20, 200)}
+QUICK_SIZES = {"catalog": (100, 1000), "cart": (1, 10), "history": (1, 20)}
+ORDER_CODES = ("mais-vendidos", "menor-preco", "maior-preco")
+CATEGORIES = ("kits", "skincare", "maquiagem")
+URGENCY_LEVELS = ("Baixa", "Média", "Alta", "Crítica")
+
+
+def synthetic_catalog_rows(size, seed=1):
+    rng = random.Random(seed)
+    for index in range(size):
+        category_slug = CATEGORIES[index % len(CATEGORIES)]
+        product = {
+            "slug": f"bench-{index:06d}",
+            "name": f"Produto {category_slug} {index}",
+            "category_slug": category_slug,
+            "category_label": category_slug.capitalize(),
+            "price_cents": rng.randint(990, 29990),
+            "description_short": f"Descricao curta {index}",
+            "description_long": f"Descricao longa do produto {index} para {category_slug}.",
+            "image_filename": "img-produto-placeholder.png",
+            "featured_order": index % 50 if index % 4 else None,
+            "active": index % 20 != 0,
+        }
+        mapping = None
+        if index % 3 == 0:
+            mapping = {
+                "occurrence_category": f"Categoria {index % 7}",
+                "urgency_level": URGENCY_LEVELS[index % len(URGENCY_LEVELS)],
+            }
+        yield product, mapping
+
+
+class CatalogEnvironment:
+    def __init__(self, catalog_size, workdir):
+        from app import create_app
+        from app.catalog import import_catalog
+        from app.models import Product, db
+        from config import Config
+
+        database_path = os.path.join(workdir, f"catalog-{catalog_size}.db")
+
+        class BenchmarkConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{database_path}"
+            SQLALCHEMY_BINDS = {}
+            SCHEMA_AUTO_UPGRADE = True
+            TEMPLATE_WARMUP = False
+            RATE_LIMIT_ENABLED = False
+            # Nada de threads de fundo nem arquivos fora do workdir durante as medicoes.
+            TASKS_DURABLE_PATH = os.path.join(workdir, "tasks.db")
+            SLOW_QUERY_LOG_ENABLED = False
+            METRICS_ENABLED = False
+            NPLUSONE_MODE = "off"
+
+        self.app = create_app(BenchmarkConfig)
+        self.context = self.app.test_request_context("/")
+        self.context.push()
+        import_catalog(synthetic_catalog_rows(catalog_size))
+        self.db = db
+        self.product_ids = db.session.scalars(
+            db.select(Product.id).where(Product.active.is_(True)).order_by(Product.id)
+        ).all()
+
+    def cart(self, size):
+        from app.identity import CART_SESSION_KEY
+        from flask import session
+
+        rng = random.Random(size)
+        product_ids = rng.sample(self.product_ids, min(size, len(self.product_ids)))
+        cart = {str(product_id): rng.randint(1, 3) for product_id in product_ids}
+        session[CART_SESSION_KEY] = cart
+        return cart
+
+    def fresh_session(self):
+        # Cada requisicao real comeca com o identity map vazio.
+        self.db.session.expunge_all()
+
+    def close(self):
+        self.db.session.remove()
+        for engine in self.db.engines.values():
+            engine.dispose()
+        self.context.pop()
+
+
+def measure(func, setup=None, repeat=7, min_time=0.05):
+    warmup_until = time.perf_counter() + min_time
+    while time.perf_counter() < warmup_until:
+        if setup is not None:
+            setup()
+        func()
+
+    if setup is None:
+        timer = timeit.Timer(func)
+        number, elapsed = timer.autorange()
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+        return [total / number for total in timer.repeat(repeat=repeat, number=number)], number
+
+    samples = []
+    deadline = time.perf_counter() + min_time * repeat
+    # Mesmo criterio do timeit: o GC fica fora da medicao.
+    gc.collect()
+    gc.disable()
+    try:
+        while len(samples) < repeat or (time.perf_counter() < deadline and len(samples) < 10000):
+            setup()
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return samples, 1
+
+
+def pure_cases(sizes):
+    from app.models import Occurrence
+    from app.utils import format_brl, format_datetime_br
+
+    yield "format_brl", (lambda: format_brl(1234567)), None
+    moment = datetime(2026, 3, 14, 15, 9)
+    yield "format_datetime_br", (lambda: format_datetime_br(moment)), None
+
+    for history_size in sizes["history"]:
+        occurrence = Occurrence()
+        occurrence.set_items(
+            [
+                {
+                    "product_id": index,
+                    "product_name": f"Produto {index}",
+                    "category_slug": CATEGORIES[index % len(CATEGORIES)],
+                    "quantity": 1 + index % 3,
+                    "unit_price_cents": 1990 + index,
+                    "line_total_cents": (1990 + index) * (1 + index % 3),
+                }
+                for index in range(history_size)
+            ]
+        )
+        yield f"get_items[items={history_size}]", occurrence.get_items, None
+
+
+def catalog_cases(environment, catalog_size, sizes):
+    from app.routes.store import (
+        _build_cart_lines,
+        _classify_cart_lines,
+        _get_cart_dict,
+        _load_products,
+    )
+
+    for order_code in ORDER_CODES:
+        yield (
+            f"load_products[catalog={catalog_size},order={order_code}]",
+            lambda order_code=order_code: _load_products(order_code=order_code),
+            environment.fresh_session,
+        )
+
+    for cart_size in sizes["cart"]:
+        environment.cart(cart_size)
+        if catalog_size == sizes["catalog"][0]:
+            # Sem banco: o custo so depende do tamanho do carrinho.
+            yield f"get_cart_dict[cart={cart_size}]", _get_cart_dict, None
+        yield (
+            f"build_cart_lines[catalog={catalog_size},cart={cart_size}]",
+            _build_cart_lines,
+            environment.fresh_session,
+        )
+        cart_lines, _ = _build_cart_lines()
+        yield (
+            f"checkout_classify[catalog={catalog_size},cart={cart_size}]",
+            lambda cart_lines=cart_lines: _classify_cart_lines(cart_lines),
+            environment.fresh_session,
+        )
+
+
+def run_case(name, func, setup, options, results):
+    if options.filter and options.filter not in name:
+        return
+    samples, number = measure(func, setup, repeat=options.repeat, min_time=options.min_time)
+    results[name] = {**summarize_durations(samples, unit="us"), "number": number}
+    entry = results[name]
+    print(
+        f"{name:<58} {entry['p50_us']:>12.2f} {entry['p95_us']:>12.2f} {entry['count']:>7}",
+        flush=True,
+    )
+
+
+def run_benchmarks(options):
+    sizes = dict(QUICK_SIZES if options.quick else DEFAULT_SIZES)
+    for key in ("catalog", "cart", "history"):
+        override = getattr(options, f"{key}_sizes")
+        if override:
+            sizes[key] = tuple(int(value) for value in override.split(","))
+
+    results = {}
+    print(f"{'benchmark':<58} {'p50 (us)':>12} {'p95 (us)':>12} {'amostras':>7}")
+    workdir = tempfile.mkdtemp(prefix="alomana-bench-")
+    try:
+        for catalog_size in sizes["catalog"]:
+            environment = CatalogEnvironment(catalog_size, workdir)
+            try:
+                if catalog_size == sizes["catalog"][0]:
+                    for name, func, setup in pure_cases(sizes):
+                        run_case(name, func, setup, options, results)
+                for name, func, setup in catalog_cases(environment, catalog_size, sizes):
+                    run_case(name, func, setup, options, results)
+            finally:
+                environment.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results, sizes
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.micro",
+        description="Micro-benchmarks dos helpers e internos de rotas mais quentes.",
+    )
+    parser.add_argument("--quick", action="store_true", help="Usa tamanhos menores.")
+    parser.add_argument("--catalog-sizes", help="Ex.: 100,1000,10000")
+    parser.add_argument("--cart-sizes", help="Ex.: 1,10,50")
+    parser.add_argument("--history-sizes", help="Itens por ocorrencia. Ex.: 1,20,200")
+    parser.add_argument("-k", "--filter", help="Roda so os benchmarks cujo nome contem o texto.")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Segundos por repeticao.")
+    parser.add_argument("--output", help="Arquivo JSON do relatorio.")
+    parser.add_argument(
+        "--save-baseline",
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        help="Grava o resultado como baseline (padrao: benchmarks/baselines/micro.json).",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        help="Compara com uma baseline (padrao: benchmarks/baselines/micro.json).",
+    )
+    # O minimo e o mais estavel entre execucoes; p50/p95 mostram a dispersao.
+    parser.add_argument(
+        "--metric", default="min_us", choices=("min_us", "p50_us", "p95_us", "mean_us")
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="Piora tolerada (0.25 = 25%%)."
+    )
+    return parser
+
+
+def main(argv=None):
+    options = build_parser().parse_args(argv)
+    sys.path.insert(0, ROOT_DIR)
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+    results, sizes = run_benchmarks(options)
+    report = {
+        "meta": report_metadata(
+            kind="micro",
+            python=sys.version.split()[0],
+            sizes={key: list(values) for key, values in sizes.items()},
+            repeat=options.repeat,
+            min_time_s=options.min_time,
+        ),
+        "benchmarks": results,
+    }
+
+    for path in (options.output, options.save_baseline):
+        if path:
+            write_report(report, path)
+            print(f"Relatorio salvo em {path}.")
+
+    if options.compare:
+        if not os.path.exists(options.compare):
+            raise SystemExit(f"Baseline {options.compare} nao encontrada; use --save-baseline.")
+        baseline = load_report(options.compare)
+        regressions, lines = compare_entries(
+            baseline.get("benchmarks", {}), results, options.metric, options.threshold
+        )
+        print(f"Comparacao de {options.metric} com {options.compare}:")
+        print("\n".join(lines))
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) acima do limite de {options.threshold:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import json
+import math
+import os
+import subprocess
+from datetime import datetime
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+UNIT_SCALES = {"ms": 1e3, "us": 1e6}
+
+
+def summarize_durations(durations, unit="ms"):
+    scale = UNIT_SCALES[unit]
+    values = sorted(durations)
+    count = len(values)
+    return {
+        "count": count,
+        f"min_{unit}": round(values[0] * scale, 3) if count else 0.0,
+        f"mean_{unit}": round(sum(values) / count * scale, 3) if count else 0.0,
+        f"p50_{unit}": round(percentile(values, 50) * scale, 3),
+        f"p95_{unit}": round(percentile(values, 95) * scale, 3),
+        f"p99_{unit}": round(percentile(values, 99) * scale, 3),
+        f"max_{unit}": round(values[-1] * scale, 3) if count else 0.0,
+    }
+
+
+def git_revision(cwd=None):
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report_metadata(**extra):
+    return {
+        "commit": git_revision(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        **extra,
+    }
+
+
+def write_report(report, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def compare_entries(baseline, current, metric, threshold):
+    unit = metric.rsplit("_", 1)[-1]
+    regressions = []
+    lines = []
+    for name, entry in sorted(current.items()):
+        previous = baseline.get(name)
+        if not previous or not previous.get(metric):
+            lines.append(f"  {name}: {entry[metric]:.3f} {unit} (sem baseline)")
+            continue
+        ratio = entry[metric] / previous[metric]
+        marker = ""
+        if ratio > 1 + threshold:
+            marker = "  REGRESSAO"
+            regressions.append(name)
+        lines.append(
+            f"  {name}: {previous[metric]:.3f} -> {entry[metric]:.3f} {unit} "
+            f"({(ratio - 1) * 100:+.1f}%){marker}"
+        )
+    return regressions, lines
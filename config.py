@@ -11,14 +11,158 @@ def _normalize_database_url(raw_url: str) -> str:
     return raw_url
 
 
+def _sqlite_pragmas():
+    return {
+        "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-20000")),
+        "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+    }
+
+
+def _engine_options(database_url: str) -> dict:
+    if database_url.startswith("sqlite"):
+        busy_timeout_ms = _sqlite_pragmas()["busy_timeout"]
+        return {"connect_args": {"timeout": busy_timeout_ms / 1000}}
+
+    if database_url.startswith("postgresql"):
+        options = {
+            "pool_size": int(os.environ.get("DB_POOL_SIZE", "5")),
+            "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+            "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", "10")),
+            "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+            "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") == "1",
+        }
+        statement_timeout_ms = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", "5000"))
+        if statement_timeout_ms > 0:
+            options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+        return options
+
+    return {}
+
+
+def _replica_binds(replica_url: str) -> dict:
+    if not replica_url:
+        return {}
+    replica_url = _normalize_database_url(replica_url)
+    return {"replica": {"url": replica_url, **_engine_options(replica_url)}}
+
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-in-production")
     SQLALCHEMY_DATABASE_URI = _normalize_database_url(
         os.environ.get("DATABASE_URL", f"sqlite:///{(BASE_DIR / 'alomana.db').as_posix()}")
     )
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_BINDS = _replica_binds(os.environ.get("DATABASE_REPLICA_URL", ""))
+    REPLICA_READ_BLUEPRINTS = tuple(
+        os.environ.get("REPLICA_READ_BLUEPRINTS", "store,api").replace(" ", "").split(",")
+    )
+    REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "5"))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_PRAGMAS = _sqlite_pragmas()
+    INVALIDATION_CHECK_TTL = float(os.environ.get("INVALIDATION_CHECK_TTL", "2"))
+    FRAGMENT_CACHE_ENABLED = os.environ.get("FRAGMENT_CACHE_ENABLED", "1") == "1"
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get("FRAGMENT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get("FRAGMENT_CACHE_MAX_ENTRIES", "5000"))
+    FRAGMENT_CACHE_DEFAULT_TTL = int(os.environ.get("FRAGMENT_CACHE_DEFAULT_TTL", "300"))
+    API_PAYLOAD_CACHE_ENABLED = os.environ.get("API_PAYLOAD_CACHE_ENABLED", "1") == "1"
+    API_PAYLOAD_CACHE_MAX_BYTES = int(
+        os.environ.get("API_PAYLOAD_CACHE_MAX_BYTES", str(8 * 1024 * 1024))
+    )
+    API_PAYLOAD_CACHE_MAX_ENTRIES = int(os.environ.get("API_PAYLOAD_CACHE_MAX_ENTRIES", "500"))
+    API_PAYLOAD_CACHE_TTL = int(os.environ.get("API_PAYLOAD_CACHE_TTL", "300"))
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+    METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR", "")
+    METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "1.0"))
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+    PROFILING_DIR = os.environ.get("PROFILING_DIR", (BASE_DIR / "profiles").as_posix())
+    PROFILING_MODE = os.environ.get("PROFILING_MODE", "deterministic")
+    PROFILING_SAMPLE_RATE = int(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_SAMPLING_INTERVAL_MS = float(os.environ.get("PROFILING_SAMPLING_INTERVAL_MS", "5"))
+    PROFILING_MAX_FILES = int(os.environ.get("PROFILING_MAX_FILES", "200"))
+    SLOW_QUERY_LOG_ENABLED = os.environ.get("SLOW_QUERY_LOG_ENABLED", "1") == "1"
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "200"))
+    SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "1") == "1"
+    SLOW_QUERY_RETENTION_DAYS = int(os.environ.get("SLOW_QUERY_RETENTION_DAYS", "7"))
+    SLOW_QUERY_MAX_ROWS = int(os.environ.get("SLOW_QUERY_MAX_ROWS", "5000"))
+    SLOW_QUERY_QUEUE_SIZE = int(os.environ.get("SLOW_QUERY_QUEUE_SIZE", "1000"))
+    # Vazio: "warn" com debug/testing ligado, "off" em producao.
+    NPLUSONE_MODE = os.environ.get("NPLUSONE_MODE", "")
+    NPLUSONE_THRESHOLD = int(os.environ.get("NPLUSONE_THRESHOLD", "5"))
+    TASKS_ENABLED = os.environ.get("TASKS_ENABLED", "1") == "1"
+    TASKS_WORKERS = int(os.environ.get("TASKS_WORKERS", "2"))
+    TASKS_QUEUE_SIZE = int(os.environ.get("TASKS_QUEUE_SIZE", "1000"))
+    TASKS_MAX_RETRIES = int(os.environ.get("TASKS_MAX_RETRIES", "5"))
+    TASKS_RETRY_BACKOFF_SECONDS = float(os.environ.get("TASKS_RETRY_BACKOFF_SECONDS", "1"))
+    TASKS_RETRY_BACKOFF_MAX_SECONDS = float(os.environ.get("TASKS_RETRY_BACKOFF_MAX_SECONDS", "300"))
+    TASKS_DURABLE_PATH = os.environ.get("TASKS_DURABLE_PATH", (BASE_DIR / "tasks.db").as_posix())
+    TASKS_POLL_INTERVAL = float(os.environ.get("TASKS_POLL_INTERVAL", "1"))
+    TASKS_LEASE_SECONDS = int(os.environ.get("TASKS_LEASE_SECONDS", "300"))
+    TASKS_SHUTDOWN_TIMEOUT = float(os.environ.get("TASKS_SHUTDOWN_TIMEOUT", "5"))
+    CRITICAL_ALERT_WEBHOOK_URL = os.environ.get("CRITICAL_ALERT_WEBHOOK_URL", "")
+    CRITICAL_ALERT_WEBHOOK_TIMEOUT = float(os.environ.get("CRITICAL_ALERT_WEBHOOK_TIMEOUT", "5"))
+    REPORTS_TOKEN = os.environ.get("REPORTS_TOKEN", "")
+    REPORTS_DEFAULT_DAYS = int(os.environ.get("REPORTS_DEFAULT_DAYS", "7"))
+    REPORTS_MAX_HOURLY_DAYS = int(os.environ.get("REPORTS_MAX_HOURLY_DAYS", "31"))
+    REPORTS_MAX_DAILY_DAYS = int(os.environ.get("REPORTS_MAX_DAILY_DAYS", "366"))
+    REPORTS_CACHE_SECONDS = int(os.environ.get("REPORTS_CACHE_SECONDS", "60"))
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "1") == "1"
+    COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "500"))
+    COMPRESSION_LEVEL = int(os.environ.get("COMPRESSION_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4"))
+    FREEZE_OUTPUT_DIR = os.environ.get(
+        "FREEZE_OUTPUT_DIR", (BASE_DIR / "build" / "site").as_posix()
+    )
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get(
+        "JINJA_BYTECODE_CACHE_DIR", (BASE_DIR / ".jinja_cache").as_posix()
+    )
+    TEMPLATE_WARMUP = os.environ.get("TEMPLATE_WARMUP", "1") == "1"
+    SCHEMA_AUTO_UPGRADE = os.environ.get("SCHEMA_AUTO_UPGRADE", "0") == "1"
     ADMIN_DEFAULT_USERNAME = os.environ.get("ADMIN_DEFAULT_USERNAME", "admin")
     ADMIN_DEFAULT_PASSWORD = os.environ.get("ADMIN_DEFAULT_PASSWORD", "admin123")
     USER_DEFAULT_USERNAME = os.environ.get("USER_DEFAULT_USERNAME", "usuario_demo")
     USER_DEFAULT_EMAIL = os.environ.get("USER_DEFAULT_EMAIL", "usuario@alomana.local")
     USER_DEFAULT_PASSWORD = os.environ.get("USER_DEFAULT_PASSWORD", "usuario123")
+    PASSWORD_HASH_ALGORITHM = os.environ.get("PASSWORD_HASH_ALGORITHM", "scrypt")
+    PASSWORD_HASH_SCRYPT_N = int(os.environ.get("PASSWORD_HASH_SCRYPT_N", str(2**15)))
+    PASSWORD_HASH_SCRYPT_R = int(os.environ.get("PASSWORD_HASH_SCRYPT_R", "8"))
+    PASSWORD_HASH_SCRYPT_P = int(os.environ.get("PASSWORD_HASH_SCRYPT_P", "1"))
+    PASSWORD_HASH_PBKDF2_ITERATIONS = int(
+        os.environ.get("PASSWORD_HASH_PBKDF2_ITERATIONS", "600000")
+    )
+    PASSWORD_HASH_ARGON2_TIME_COST = int(os.environ.get("PASSWORD_HASH_ARGON2_TIME_COST", "3"))
+    PASSWORD_HASH_ARGON2_MEMORY_COST = int(
+        os.environ.get("PASSWORD_HASH_ARGON2_MEMORY_COST", "65536")
+    )
+    PASSWORD_HASH_ARGON2_PARALLELISM = int(
+        os.environ.get("PASSWORD_HASH_ARGON2_PARALLELISM", "1")
+    )
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_EXECUTOR = os.environ.get("PASSWORD_HASH_EXECUTOR", "thread")
+    TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+    RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_SQLITE_PATH = os.environ.get(
+        "RATE_LIMIT_SQLITE_PATH", (BASE_DIR / "ratelimit.db").as_posix()
+    )
+    RATE_LIMIT_RULES = {
+        "user_login": {
+            "ip": os.environ.get("RATE_LIMIT_USER_LOGIN_IP", "20/minute"),
+            "account": os.environ.get("RATE_LIMIT_USER_LOGIN_ACCOUNT", "5/minute"),
+        },
+        "admin_login": {
+            "ip": os.environ.get("RATE_LIMIT_ADMIN_LOGIN_IP", "10/minute"),
+            "account": os.environ.get("RATE_LIMIT_ADMIN_LOGIN_ACCOUNT", "5/minute"),
+        },
+        "register": {
+            "ip": os.environ.get("RATE_LIMIT_REGISTER_IP", "5/minute"),
+        },
+        "checkout": {
+            "ip": os.environ.get("RATE_LIMIT_CHECKOUT_IP", "10/minute"),
+            "account": os.environ.get("RATE_LIMIT_CHECKOUT_ACCOUNT", "5/minute"),
+        },
+    }
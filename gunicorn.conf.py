@@ -0,0 +1,121 @@
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+
+
+def _env_int(name, default):
+    raw_value = os.environ.get(name)
+    return int(raw_value) if raw_value else default
+
+
+def _read_first_line(path):
+    try:
+        with open(path, encoding="ascii") as handle:
+            return handle.readline().strip()
+    except OSError:
+        return ""
+
+
+def available_cpus():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = multiprocessing.cpu_count()
+
+    quota, _, period = _read_first_line("/sys/fs/cgroup/cpu.max").partition(" ")
+    if quota and quota != "max" and period:
+        cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    return max(1, cpus)
+
+
+def available_memory_mb():
+    limits = []
+    cgroup_limit = _read_first_line("/sys/fs/cgroup/memory.max") or _read_first_line(
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes"
+    )
+    if cgroup_limit.isdigit() and int(cgroup_limit) < 1 << 60:
+        limits.append(int(cgroup_limit) // (1024 * 1024))
+
+    try:
+        with open("/proc/meminfo", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("MemTotal:"):
+                    limits.append(int(line.split()[1]) // 1024)
+                    break
+    except OSError:
+        pass
+    return min(limits) if limits else None
+
+
+def auto_workers(worker_class_name, cpus, memory_mb):
+    if worker_class_name == "sync":
+        workers = 2 * cpus + 1
+    else:
+        workers = cpus + 1
+
+    per_worker_mb = _env_int("GUNICORN_WORKER_MEMORY_MB", 160)
+    if memory_mb:
+        # Reserva parte da memoria para o master e o sistema.
+        workers = min(workers, max(1, int(memory_mb * 0.8) // per_worker_mb))
+    return max(1, workers)
+
+
+# gthread por padrao: o hash de senha roda no pool do app e libera o GIL, entao as outras
+# threads do worker seguem atendendo durante um login; com sync o worker inteiro espera.
+worker_class_name = os.environ.get("GUNICORN_WORKER_CLASS", "gthread").lower()
+worker_class = WORKER_CLASSES.get(worker_class_name, worker_class_name)
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+workers = _env_int("WEB_CONCURRENCY", 0) or auto_workers(
+    worker_class_name, available_cpus(), available_memory_mb()
+)
+threads = _env_int("GUNICORN_THREADS", 4 if worker_class_name == "gthread" else 1)
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10)
+timeout = _env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+
+# Cada worker grava suas metricas aqui; /metrics agrega todos.
+os.environ.setdefault(
+    "METRICS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), f"alomana-metrics-{os.getpid()}"),
+)
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    metrics_dir = os.environ["METRICS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def when_ready(server):
+    server.log.info(
+        "Gunicorn pronto: %s workers %s, %s threads, preload=%s",
+        workers,
+        worker_class,
+        threads,
+        preload_app,
+    )
+
+
+def post_fork(server, worker):
+    # Conexoes abertas pelo master (preload) nao podem ser compartilhadas entre processos.
+    from app.engine import dispose_engines
+
+    dispose_engines()
@@ -1,6 +1,9 @@
-from app import create_app
 import os
 
+os.environ.setdefault("SCHEMA_AUTO_UPGRADE", "1")
+
+from app import create_app  # noqa: E402
+
 
 app = create_app()
 
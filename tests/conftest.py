@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from config import Config, _engine_options, _normalize_database_url
+
+
+DATABASES = ["sqlite"]
+if os.environ.get("DATABASE_URL", "").startswith(("postgres://", "postgresql")):
+    DATABASES.append("postgresql")
+
+
+def _test_config(database_url, tmp_dir):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ENGINE_OPTIONS = _engine_options(database_url)
+        SQLALCHEMY_BINDS = {}
+        SCHEMA_AUTO_UPGRADE = False
+        TEMPLATE_WARMUP = False
+        SLOW_QUERY_LOG_ENABLED = False
+        NPLUSONE_MODE = "off"
+        TASKS_DURABLE_PATH = os.path.join(tmp_dir, "tasks.db")
+        RATE_LIMIT_ENABLED = False
+
+    return TestConfig
+
+
+@pytest.fixture(scope="session", params=DATABASES)
+def app(request, tmp_path_factory):
+    from app import create_app
+    from app.migrations import upgrade
+    from app.models import db
+    from app.seed import seed_database
+    from app.synthetic import generate_dataset
+    from app.tasks import task_runner
+
+    tmp_dir = str(tmp_path_factory.mktemp(request.param))
+    if request.param == "sqlite":
+        database_url = f"sqlite:///{os.path.join(tmp_dir, 'alomana.db')}"
+    else:
+        # Banco descartavel: o teste gera dados sinteticos nele.
+        database_url = _normalize_database_url(os.environ["DATABASE_URL"])
+
+    app = create_app(_test_config(database_url, tmp_dir))
+    with app.app_context():
+        upgrade()
+        seed_database(app.config)
+        generate_dataset(products=40, users=20, occurrences=400, seed=7, days=30)
+    yield app
+    task_runner.shutdown()
+    with app.app_context():
+        db.engine.dispose()
+
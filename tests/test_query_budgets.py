@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import select
+
+from app.identity import ADMIN_SESSION_KEY, USER_SESSION_KEY
+from app.models import AdminUser, Occurrence, Product, db
+from app.nplusone import assert_max_queries
+
+
+# O orcamento vem do @query_budget da propria view; aqui so a requisicao que o exercita.
+BUDGETED_ROUTES = (
+    ("admin.occurrences_page", "admin", "GET", "/admin/ocorrencias"),
+    ("admin.occurrence_detail_page", "admin", "GET", "/admin/ocorrencias/{occurrence_id}"),
+    ("admin.mappings_page", "admin", "GET", "/admin/mapeamentos"),
+    ("admin.mappings_page", "admin", "POST", "/admin/mapeamentos"),
+    ("admin.slow_queries_page", "admin", "GET", "/admin/consultas-lentas"),
+    ("user.orders_page", "user", "GET", "/meus-pedidos"),
+    ("user.order_detail_page", "user", "GET", "/meus-pedidos/{occurrence_id}"),
+    ("store.product_detail_page", None, "GET", "/produto/{product_slug}"),
+    ("store.product_detail_page", "user", "GET", "/produto/{product_slug}"),
+)
+
+
+@pytest.fixture(scope="module")
+def route_fixtures(app):
+    with app.app_context():
+        occurrence = db.session.scalars(
+            select(Occurrence).where(Occurrence.user_id.isnot(None)).order_by(Occurrence.id).limit(1)
+        ).first()
+        product = db.session.scalars(
+            select(Product).where(Product.active.is_(True)).order_by(Product.id).limit(1)
+        ).first()
+        return {
+            "admin_id": db.session.scalar(select(AdminUser.id).order_by(AdminUser.id).limit(1)),
+            "user_id": occurrence.user_id,
+            "occurrence_id": occurrence.id,
+            "product_id": product.id,
+            "product_slug": product.slug,
+        }
+
+
+def test_every_budgeted_view_is_covered(app):
+    budgeted = {
+        endpoint
+        for endpoint, view in app.view_functions.items()
+        if getattr(view, "query_budget", None) is not None
+    }
+    assert budgeted == {endpoint for endpoint, _, _, _ in BUDGETED_ROUTES}
+
+
+@pytest.mark.parametrize(("endpoint", "login", "method", "path"), BUDGETED_ROUTES)
+def test_route_query_budget(app, route_fixtures, endpoint, login, method, path):
+    client = app.test_client()
+    if login is not None:
+        with client.session_transaction() as session:
+            if login == "admin":
+                session[ADMIN_SESSION_KEY] = route_fixtures["admin_id"]
+            else:
+                session[USER_SESSION_KEY] = route_fixtures["user_id"]
+
+    data = None
+    if method == "POST":
+        data = {
+            "product_id": route_fixtures["product_id"],
+            "occurrence_category": "Ocorrencia de teste",
+            "urgency_level": "Alta",
+        }
+    with assert_max_queries(app.view_functions[endpoint].query_budget, max_repeats=1):
+        response = client.open(path.format(**route_fixtures), method=method, data=data)
+    assert response.status_code == (302 if method == "POST" else 200)
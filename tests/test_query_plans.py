@@ -0,0 +1,13 @@
+from app.queryplans import PLAN_CHECKS, run_plan_checks
+
+
+def test_hot_routes_use_their_indexes(app):
+    results = run_plan_checks(app)
+
+    assert len(results) == len(PLAN_CHECKS)
+    problems = {
+        result["check"]["endpoint"]: result["problems"] for result in results if result["problems"]
+    }
+    assert not problems, "\n".join(
+        f"{endpoint}: {'; '.join(items)}" for endpoint, items in problems.items()
+    )